@@ -0,0 +1,8 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def eager_jobs(settings):
+    '''Как и core.runner.EagerJobsRunner для manage.py test:
+    задачи core.jobs выполняются сразу, без воркеров'''
+    settings.JOBS_ALWAYS_EAGER = True
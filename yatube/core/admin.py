@@ -0,0 +1,16 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk', 'name', 'status', 'attempts', 'run_at', 'wait_ms',
+        'duration_ms',
+    )
+    list_filter = ('status', 'name')
+    search_fields = ('key',)
+    empty_value_display = '-пусто-'
+
+
+admin.site.register(Job, JobAdmin)
@@ -0,0 +1,134 @@
+import asyncio
+import io
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+
+class WsgiToAsgi:
+    '''ASGI-приложение поверх WSGI-обработчика Django.
+
+    Django 2.2 не умеет асинхронные вью, поэтому цикл событий только
+    принимает соединения и читает тела запросов, а сам обработчик
+    выполняется в пуле из ASGI_THREADS потоков. Медленный запрос
+    занимает поток пула, а не цикл: остальные соединения тем временем
+    принимаются и ждут свободного потока. Тело ответа отдаётся
+    кусками по мере готовности, StreamingHttpResponse не буферизуется.'''
+
+    def __init__(self, wsgi_application, workers=None):
+        self.wsgi_application = wsgi_application
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers or settings.ASGI_THREADS,
+            thread_name_prefix='asgi',
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise ValueError(f'Неподдерживаемый тип соединения: '
+                             f'{scope["type"]}')
+        body = await self.read_body(receive)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(
+            self.executor, self.run_wsgi, loop, scope, body, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def read_body(self, receive):
+        chunks = []
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                break
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body', False):
+                break
+        return b''.join(chunks)
+
+    def environ(self, scope, body):
+        '''WSGI environ по ASGI scope (PEP 3333)'''
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', '').encode().decode(
+                'latin1'),
+            'PATH_INFO': scope['path'].encode().decode('latin1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'REMOTE_ADDR': client[0],
+            'REMOTE_PORT': str(client[1]),
+            'SERVER_PROTOCOL': 'HTTP/' + scope.get('http_version', '1.1'),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+        for name, value in scope.get('headers', []):
+            name, value = name.decode('latin1'), value.decode('latin1')
+            if name == 'content-type':
+                key = 'CONTENT_TYPE'
+            elif name == 'content-length':
+                key = 'CONTENT_LENGTH'
+            else:
+                key = 'HTTP_' + name.upper().replace('-', '_')
+            if key in environ:
+                value = f'{environ[key]},{value}'
+            environ[key] = value
+        return environ
+
+    def run_wsgi(self, loop, scope, body, send):
+        '''Выполняется в потоке пула: вызывает WSGI-обработчик
+        и передаёт ответ в цикл событий'''
+        def emit(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and started.get('sent'):
+                raise exc_info[1].with_traceback(exc_info[2])
+            started['message'] = {
+                'type': 'http.response.start',
+                'status': int(status.split(' ', 1)[0]),
+                'headers': [
+                    (name.lower().encode('latin1'), value.encode('latin1'))
+                    for name, value in headers
+                ],
+            }
+
+        result = self.wsgi_application(
+            self.environ(scope, body), start_response)
+        try:
+            for chunk in result:
+                if not started.get('sent'):
+                    emit(started['message'])
+                    started['sent'] = True
+                if chunk:
+                    emit({
+                        'type': 'http.response.body',
+                        'body': chunk,
+                        'more_body': True,
+                    })
+            if not started.get('sent'):
+                emit(started['message'])
+            emit({'type': 'http.response.body', 'body': b''})
+        finally:
+            close = getattr(result, 'close', None)
+            if close is not None:
+                close()
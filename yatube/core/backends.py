@@ -0,0 +1,34 @@
+import time
+
+from django.template.backends.django import DjangoTemplates, Template
+
+from . import profiling
+
+
+class ProfilingTemplate(Template):
+    '''Шаблон, который добавляет время рендера в профиль запроса.
+    Вложенные рендеры не считаются повторно.'''
+
+    def render(self, context=None, request=None):
+        profile = profiling.current()
+        if profile is None:
+            return super().render(context, request)
+        profile.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            profile.template_depth -= 1
+            if not profile.template_depth:
+                profile.template_time += time.perf_counter() - started
+
+
+class ProfilingDjangoTemplates(DjangoTemplates):
+    '''Стандартный движок шаблонов Django с замером времени рендера'''
+
+    def from_string(self, template_code):
+        return ProfilingTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return ProfilingTemplate(template.template, self)
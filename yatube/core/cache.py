@@ -0,0 +1,404 @@
+import fcntl
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.utils.module_loading import import_string
+
+_MISSING = object()
+
+
+class MemoryJournal:
+    '''Журнал инвалидаций в памяти: общий для экземпляров кеша
+    в потоках одного процесса. Кольцо из size записей
+    (номер, ключи) и номер последней записи.'''
+
+    def __init__(self, size):
+        self.size = size
+        self.lock = threading.Lock()
+        self.sequence = 0
+        self.entries = {}
+
+    def head(self):
+        return self.sequence
+
+    def locked(self):
+        '''Блокировка журнала для атомарных операций над L2 (incr)'''
+        return self.lock
+
+    def append(self, keys):
+        '''Добавляет запись и возвращает её номер'''
+        with self.lock:
+            self.sequence += 1
+            self.entries[self.sequence % self.size] = (self.sequence, keys)
+            return self.sequence
+
+    def reset(self):
+        '''Сдвигает номер дальше кольца: все читатели очистят L1'''
+        with self.lock:
+            self.sequence += self.size + 1
+            self.entries.clear()
+
+    def read(self, first, last):
+        '''Ключи записей с first по last или None, если часть
+        из них уже перезаписана'''
+        keys = []
+        for number in range(first, last + 1):
+            entry = self.entries.get(number % self.size)
+            if entry is None or entry[0] != number:
+                return None
+            keys.extend(entry[1])
+        return keys
+
+
+_memory_journals = {}
+_memory_journals_lock = threading.Lock()
+
+
+def memory_journal(name, size):
+    with _memory_journals_lock:
+        return _memory_journals.setdefault(name, MemoryJournal(size))
+
+
+class FileJournal:
+    '''Журнал инвалидаций в отдельном каталоге, общий для процессов.
+
+    Номер выдаётся под блокировкой flock на файле lock, так что
+    параллельные писатели не получают один и тот же номер. Файлы
+    записей и номера заменяются атомарно (os.replace): читателям
+    блокировка не нужна. Каталог не входит в вытеснение L2
+    по MAX_ENTRIES, и номер не сбрасывается вместе с записями кеша.'''
+
+    def __init__(self, path, size):
+        self.size = size
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _load(self, name, default=None):
+        try:
+            with open(self._file(name), 'rb') as file:
+                return pickle.load(file)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return default
+
+    def _dump(self, name, value):
+        fd, temp = tempfile.mkstemp(dir=self.path)
+        with open(fd, 'wb') as file:
+            pickle.dump(value, file, pickle.HIGHEST_PROTOCOL)
+        os.replace(temp, self._file(name))
+
+    @contextmanager
+    def locked(self):
+        '''Блокировка flock, общая для всех процессов: под ней выдаются
+        номера записей и выполняется incr файлового L2, который сам
+        по себе — неатомарные чтение и запись'''
+        with open(self._file('lock'), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _locked(self, change):
+        with self.locked():
+            return change(self.head())
+
+    def head(self):
+        return self._load('sequence', 0)
+
+    def append(self, keys):
+        def change(sequence):
+            sequence += 1
+            # Сначала запись, потом номер: читатель, увидевший номер,
+            # найдёт и запись.
+            self._dump(f'{sequence % self.size}.entry', (sequence, keys))
+            self._dump('sequence', sequence)
+            return sequence
+        return self._locked(change)
+
+    def reset(self):
+        def change(sequence):
+            self._dump('sequence', sequence + self.size + 1)
+        self._locked(change)
+
+    def read(self, first, last):
+        keys = []
+        for number in range(first, last + 1):
+            entry = self._load(f'{number % self.size}.entry')
+            if entry is None or entry[0] != number:
+                return None
+            keys.extend(entry[1])
+        return keys
+
+
+class ProcessTier:
+    '''L1 процесса: записи LRU, их блокировка, счётчики и состояние
+    чтения журнала. Django создаёт экземпляр кеша на каждый поток,
+    а L1 у них общий — иначе память и прогрев умножались бы
+    на число потоков.'''
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = threading.RLock()
+        self.stats = Counter()
+        self.seen = None
+        self.synced = None
+
+
+_tiers = {}
+_tiers_lock = threading.Lock()
+
+
+def process_tier(name):
+    with _tiers_lock:
+        return _tiers.setdefault(name, ProcessTier())
+
+
+class TieredCache(BaseCache):
+    '''Двухуровневый кеш: ограниченный LRU в памяти процесса (L1)
+    перед общим для всех процессов бэкендом L2_BACKEND.
+
+    Каждая запись и удаление попадают в журнал инвалидаций: при
+    файловом L2 — в его подкаталоге journal (FileJournal), иначе —
+    в памяти процесса (MemoryJournal). Процессы читают журнал
+    не чаще раза в SYNC_INTERVAL секунд и выбрасывают изменённые
+    ключи из своего L1, так что версии лент (posts.stamps)
+    расходятся между процессами не дольше этого интервала.
+    Журнал — кольцо из JOURNAL_SIZE записей: процесс, который
+    отстал сильнее, очищает L1 целиком. L1 общий для всех потоков
+    процесса с тем же LOCATION (ProcessTier).'''
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.l1_max_entries = options.get('L1_MAX_ENTRIES', 1000)
+        self.l1_max_age = options.get('L1_MAX_AGE', 60)
+        self.sync_interval = options.get('SYNC_INTERVAL', 0.1)
+        self.journal_size = options.get('JOURNAL_SIZE', 1000)
+        backend = import_string(options.get(
+            'L2_BACKEND',
+            'django.core.cache.backends.filebased.FileBasedCache',
+        ))
+        self.l2 = backend(location, {
+            'TIMEOUT': params.get('TIMEOUT', 300),
+            'OPTIONS': options.get('L2_OPTIONS', {}),
+        })
+        if isinstance(self.l2, FileBasedCache):
+            self.journal = FileJournal(
+                os.path.join(location, 'journal'), self.journal_size)
+        else:
+            self.journal = memory_journal(location, self.journal_size)
+        self._tier = process_tier(location)
+        self._l1 = self._tier.entries
+        self._lock = self._tier.lock
+        self._stats = self._tier.stats
+
+    def _count(self, name, number=1):
+        with self._lock:
+            self._stats[name] += number
+
+    def _version(self, version):
+        return self.version if version is None else version
+
+    def _timeout(self, timeout):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return self.l1_max_age
+        return min(timeout, self.l1_max_age)
+
+    def _l1_get(self, key):
+        with self._lock:
+            entry = self._l1.get(key, _MISSING)
+            if entry is _MISSING:
+                return _MISSING
+            value, expires = entry
+            if expires <= time.monotonic():
+                del self._l1[key]
+                return _MISSING
+            self._l1.move_to_end(key)
+        return pickle.loads(value)
+
+    def _l1_set(self, key, value, timeout=None):
+        max_age = self._timeout(timeout)
+        with self._lock:
+            if max_age <= 0:
+                self._l1.pop(key, None)
+                return
+            # Как и LocMemCache, храним копию: изменения полученного
+            # объекта не должны попадать в кеш.
+            self._l1[key] = (
+                pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+                time.monotonic() + max_age,
+            )
+            self._l1.move_to_end(key)
+            while len(self._l1) > self.l1_max_entries:
+                self._l1.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def _l1_delete(self, keys):
+        with self._lock:
+            for key in keys:
+                self._l1.pop(key, None)
+
+    def _sync(self):
+        '''Выбрасывает из L1 ключи, изменённые другими процессами'''
+        now = time.monotonic()
+        with self._lock:
+            if (
+                self._tier.synced is not None
+                and now - self._tier.synced < self.sync_interval
+            ):
+                return
+            self._tier.synced = now
+            sequence = self.journal.head()
+            seen, self._tier.seen = self._tier.seen, sequence
+            if seen is None or sequence == seen:
+                return
+            changed = None
+            if 0 < sequence - seen <= self.journal_size:
+                changed = self.journal.read(seen + 1, sequence)
+            if changed is None:
+                self._l1.clear()
+                self._stats['resyncs'] += 1
+                return
+            for key in changed:
+                if self._l1.pop(key, _MISSING) is not _MISSING:
+                    self._stats['invalidations'] += 1
+
+    def _publish(self, keys):
+        '''Записывает изменённые ключи в журнал для остальных процессов'''
+        sequence = self.journal.append(list(keys))
+        with self._lock:
+            # Своя запись уже отражена в L1: пропускаем её в журнале,
+            # если между ней и прошлой синхронизацией никто не писал.
+            if self._tier.seen is not None and sequence == self._tier.seen + 1:
+                self._tier.seen = sequence
+
+    def get(self, key, default=None, version=None):
+        version = self._version(version)
+        local_key = self.make_key(key, version)
+        self._sync()
+        value = self._l1_get(local_key)
+        if value is not _MISSING:
+            self._count('l1_hits')
+            return value
+        value = self.l2.get(key, _MISSING, version)
+        if value is _MISSING:
+            self._count('misses')
+            return default
+        self._count('l2_hits')
+        self._l1_set(local_key, value)
+        return value
+
+    def get_many(self, keys, version=None):
+        version = self._version(version)
+        self._sync()
+        found, remote = {}, []
+        for key in keys:
+            value = self._l1_get(self.make_key(key, version))
+            if value is _MISSING:
+                remote.append(key)
+            else:
+                found[key] = value
+        self._count('l1_hits', len(found))
+        if remote:
+            fetched = self.l2.get_many(remote, version)
+            self._count('l2_hits', len(fetched))
+            self._count('misses', len(remote) - len(fetched))
+            for key, value in fetched.items():
+                self._l1_set(self.make_key(key, version), value)
+            found.update(fetched)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        version = self._version(version)
+        local_key = self.make_key(key, version)
+        self.l2.set(key, value, timeout, version)
+        self._l1_set(local_key, value, timeout)
+        self._publish([local_key])
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        version = self._version(version)
+        if not self.l2.add(key, value, timeout, version):
+            return False
+        local_key = self.make_key(key, version)
+        self._l1_set(local_key, value, timeout)
+        self._publish([local_key])
+        return True
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        version = self._version(version)
+        failed = self.l2.set_many(data, timeout, version) or []
+        local_keys = []
+        for key, value in data.items():
+            local_key = self.make_key(key, version)
+            local_keys.append(local_key)
+            if key in failed:
+                self._l1_delete([local_key])
+            else:
+                self._l1_set(local_key, value, timeout)
+        if local_keys:
+            self._publish(local_keys)
+        return failed
+
+    def incr(self, key, delta=1, version=None):
+        version = self._version(version)
+        with self.journal.locked():
+            value = self.l2.incr(key, delta, version)
+        local_key = self.make_key(key, version)
+        self._l1_delete([local_key])
+        self._publish([local_key])
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        version = self._version(version)
+        self._l1_delete([self.make_key(key, version)])
+        return self.l2.touch(key, timeout, version)
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version)
+
+    def delete_many(self, keys, version=None):
+        version = self._version(version)
+        local_keys = [self.make_key(key, version) for key in keys]
+        self.l2.delete_many(keys, version)
+        self._l1_delete(local_keys)
+        if local_keys:
+            self._publish(local_keys)
+
+    def has_key(self, key, version=None):
+        return self.get(key, _MISSING, version) is not _MISSING
+
+    def clear(self):
+        self.l2.clear()
+        self.journal.reset()
+        with self._lock:
+            self._l1.clear()
+            self._tier.seen = self._tier.synced = None
+
+    def close(self, **kwargs):
+        self.l2.close(**kwargs)
+
+    def stats(self):
+        '''Счётчики попаданий, промахов и вытеснений процесса:
+        общие для всех его потоков'''
+        with self._lock:
+            return {
+                **{
+                    name: self._stats[name] for name in (
+                        'l1_hits', 'l2_hits', 'misses', 'evictions',
+                        'invalidations', 'resyncs',
+                    )
+                },
+                'l1_size': len(self._l1),
+            }
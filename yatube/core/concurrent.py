@@ -0,0 +1,50 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from . import routers
+
+_executor = None
+_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.VIEW_CONCURRENCY_WORKERS,
+                thread_name_prefix='fetch',
+            )
+    return _executor
+
+
+def _run(call, pinned):
+    '''Выполняет часть страницы в потоке пула. Закрепление за default
+    (core.routers) переносится из потока запроса, чтобы не прочитать
+    с реплики то, что запрос только что записал.'''
+    routers.reset(pinned)
+    close_old_connections()
+    try:
+        return call()
+    finally:
+        close_old_connections()
+
+
+def fetch(**calls):
+    '''Независимые части страницы: имя -> функция без аргументов.
+
+    При settings.VIEW_CONCURRENCY функции выполняются одновременно
+    в пуле из VIEW_CONCURRENCY_WORKERS потоков, каждая со своим
+    соединением с БД; иначе — по очереди в потоке запроса.
+    Возвращает словарь имя -> результат.'''
+    if not settings.VIEW_CONCURRENCY or len(calls) < 2:
+        return {name: call() for name, call in calls.items()}
+    executor = get_executor()
+    futures = {
+        name: executor.submit(_run, call, routers.is_pinned())
+        for name, call in calls.items()
+    }
+    return {name: future.result() for name, future in futures.items()}
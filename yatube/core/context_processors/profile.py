@@ -0,0 +1,7 @@
+from core import profiling
+
+
+def profile(request):
+    return {
+        'profile': profiling.shown(),
+    }
@@ -0,0 +1,18 @@
+import re
+
+from django.template.loader import render_to_string
+
+HOLE_RE = re.compile(r'<!--hole:([\w/.-]+)-->')
+
+
+def marker(template_name):
+    return f'<!--hole:{template_name}-->'
+
+
+def fill(content, request, context):
+    '''Подставляет в закешированный скелет страницы фрагменты,
+    отрисованные для текущего пользователя'''
+    return HOLE_RE.sub(
+        lambda match: render_to_string(match.group(1), context, request),
+        content,
+    )
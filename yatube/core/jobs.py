@@ -0,0 +1,184 @@
+import json
+import logging
+import os
+import random
+import socket
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import Avg, Count, F, Q, Sum
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+_tasks = {}
+
+
+def task(name):
+    '''Регистрирует функцию как задачу очереди под именем name.
+    Аргументы задачи — именованные и сериализуемые в JSON.'''
+    def decorator(func):
+        _tasks[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, key=None, delay=0, max_attempts=None, **kwargs):
+    '''Ставит задачу в очередь в текущей транзакции: воркеры увидят её
+    только вместе с записью, ради которой она поставлена.
+
+    Пока задача с тем же key ждёт в очереди, повторная постановка
+    её не дублирует. При JOBS_ALWAYS_EAGER задача без отсрочки
+    выполняется сразу в текущем процессе, без записи в таблицу;
+    отложенная всё равно ставится в очередь — её срок не наступил.'''
+    if name not in _tasks:
+        raise KeyError(f'Неизвестная задача: {name}')
+    if settings.JOBS_ALWAYS_EAGER and not delay:
+        _tasks[name](**kwargs)
+        return None
+    job = Job(
+        name=name,
+        payload=json.dumps(kwargs),
+        key=key,
+        max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS,
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+    try:
+        with transaction.atomic():
+            job.save()
+    except IntegrityError:
+        return Job.objects.filter(key=key, status=Job.QUEUED).first()
+    return job
+
+
+def backoff(attempts):
+    '''Пауза перед повтором: экспонента от числа попыток со случайным
+    разбросом, чтобы упавшие вместе задачи не повторялись вместе'''
+    delay = min(
+        settings.JOBS_BACKOFF_MAX,
+        settings.JOBS_BACKOFF_BASE * 2 ** (attempts - 1),
+    )
+    return delay * random.uniform(0.5, 1)
+
+
+def requeue_stale():
+    '''Возвращает в очередь задачи воркеров, которые не отчитались
+    за JOBS_LOCK_TIMEOUT секунд: процесс, скорее всего, погиб'''
+    deadline = timezone.now() - timedelta(seconds=settings.JOBS_LOCK_TIMEOUT)
+    stale = Job.objects.filter(status=Job.RUNNING, started__lt=deadline)
+    requeued = 0
+    for job in stale:
+        try:
+            with transaction.atomic():
+                requeued += Job.objects.filter(
+                    pk=job.pk, status=Job.RUNNING
+                ).update(status=Job.QUEUED, locked_by='')
+        except IntegrityError:
+            # Такая же задача уже снова в очереди.
+            Job.objects.filter(pk=job.pk).update(
+                status=Job.FAILED, last_error='Дубликат после таймаута')
+    return requeued
+
+
+def claim(worker, limit):
+    '''Забирает до limit готовых задач. Захват — условный UPDATE
+    по статусу: работает и в SQLite, где нет SELECT FOR UPDATE.'''
+    now = timezone.now()
+    candidates = Job.objects.filter(
+        status=Job.QUEUED, run_at__lte=now
+    ).order_by('run_at', 'pk').values_list('pk', flat=True)[:limit]
+    claimed = [
+        pk for pk in candidates
+        if Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+            status=Job.RUNNING, locked_by=worker, started=now,
+            attempts=F('attempts') + 1,
+        )
+    ]
+    return list(Job.objects.filter(pk__in=claimed).order_by('run_at', 'pk'))
+
+
+def execute(job):
+    '''Выполняет захваченную задачу и записывает результат: успех,
+    повтор с отсрочкой или окончательную ошибку'''
+    job.wait_ms = (job.started - job.run_at).total_seconds() * 1000
+    started = time.perf_counter()
+    try:
+        _tasks[job.name](**json.loads(job.payload))
+    except Exception:
+        job.last_error = traceback.format_exc()
+        logger.exception('Задача %s #%s упала', job.name, job.pk)
+        if job.attempts < job.max_attempts:
+            job.status = Job.QUEUED
+            job.run_at = timezone.now() + timedelta(
+                seconds=backoff(job.attempts))
+        else:
+            job.status = Job.FAILED
+            job.finished = timezone.now()
+    else:
+        job.status = Job.DONE
+        job.finished = timezone.now()
+    job.duration_ms = (time.perf_counter() - started) * 1000
+    job.locked_by = ''
+    try:
+        job.save()
+    except IntegrityError:
+        # Пока задача выполнялась, такую же поставили снова:
+        # повтор сделает она.
+        job.status = Job.FAILED
+        job.save()
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def work(burst=False, max_jobs=None):
+    '''Цикл воркера. burst — выйти, когда очередь опустеет;
+    max_jobs — выйти после стольких задач. Возвращает их число.'''
+    worker = worker_name()
+    done = 0
+    while max_jobs is None or done < max_jobs:
+        close_old_connections()
+        requeue_stale()
+        limit = settings.JOBS_BATCH_SIZE
+        if max_jobs is not None:
+            limit = min(limit, max_jobs - done)
+        jobs = claim(worker, limit)
+        if not jobs:
+            if burst:
+                break
+            time.sleep(settings.JOBS_POLL_INTERVAL)
+            continue
+        for job in jobs:
+            execute(job)
+            done += 1
+    return done
+
+
+def metrics():
+    '''Сводка по задачам: число в каждом статусе, повторы, среднее
+    ожидание в очереди после срока run_at и среднее время выполнения'''
+    rows = Job.objects.values('name', 'status').annotate(
+        total=Count('pk'),
+        attempts_total=Sum('attempts'),
+        tried=Count('pk', filter=Q(attempts__gt=0)),
+        wait=Avg('wait_ms'),
+        duration=Avg('duration_ms'),
+    ).order_by('name', 'status')
+    result = {}
+    for row in rows:
+        entry = result.setdefault(row['name'], {
+            **{status: 0 for status, _ in Job.STATUSES},
+            'retries': 0, 'wait_ms': None, 'avg_ms': None,
+        })
+        entry[row['status']] = row['total']
+        entry['retries'] += (row['attempts_total'] or 0) - row['tried']
+        if row['status'] == Job.DONE:
+            entry['wait_ms'] = round(row['wait'] or 0, 2)
+            entry['avg_ms'] = round(row['duration'] or 0, 2)
+    return result
@@ -0,0 +1,55 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core import jobs
+
+
+class Command(BaseCommand):
+    help = 'Запускает воркеры очереди фоновых задач core.jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=1,
+            help='Число процессов-воркеров',
+        )
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Выйти, когда очередь опустеет',
+        )
+        parser.add_argument(
+            '--max-jobs', type=int,
+            help='Каждому воркеру выйти после стольких задач',
+        )
+        parser.add_argument(
+            '--metrics', action='store_true',
+            help='Только вывести сводку по задачам',
+        )
+
+    def print_metrics(self):
+        columns = ('queued', 'running', 'done', 'failed', 'retries',
+                   'wait_ms', 'avg_ms')
+        self.stdout.write(f'{"job":<20}' + ''.join(
+            f'{column:>9}' for column in columns))
+        for name, entry in jobs.metrics().items():
+            self.stdout.write(f'{name:<20}' + ''.join(
+                f'{str(entry[column]):>9}' for column in columns))
+
+    def handle(self, *args, **options):
+        if options['metrics']:
+            self.print_metrics()
+            return
+        burst, max_jobs = options['burst'], options['max_jobs']
+        if options['processes'] == 1:
+            done = jobs.work(burst, max_jobs)
+        else:
+            # Соединения с БД не должны достаться дочерним процессам.
+            connections.close_all()
+            with ProcessPoolExecutor(options['processes']) as pool:
+                futures = [
+                    pool.submit(jobs.work, burst, max_jobs)
+                    for _ in range(options['processes'])
+                ]
+                done = sum(future.result() for future in futures)
+        self.stdout.write(f'Выполнено задач: {done}')
@@ -0,0 +1,147 @@
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections, transaction
+from django.test import override_settings
+
+# Значения SQLite по умолчанию; ожидание блокировки остаётся
+# как у Django — таймаут модуля sqlite3 в 5 секунд.
+STOCK_PRAGMAS = {
+    'journal_mode': 'DELETE',
+    'synchronous': 'FULL',
+    'mmap_size': 0,
+    'cache_size': -2000,
+}
+
+# Нагрузка идёт на отдельные таблицы той же базы, устроенные как посты
+# и комментарии: настоящие строки не создаются, сигналы не срабатывают.
+# Таблицы удаляются после замера.
+SCRATCH_TABLES = '''
+    CREATE TABLE IF NOT EXISTS load_post (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        text TEXT NOT NULL,
+        pub_date REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS load_post_pub_date ON load_post (pub_date);
+    CREATE TABLE IF NOT EXISTS load_comment (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        post_id INTEGER NOT NULL REFERENCES load_post (id),
+        text TEXT NOT NULL,
+        created REAL NOT NULL
+    );
+'''
+SCRATCH_ROWS = 1000
+FEED_PAGE = 10
+
+
+class Command(BaseCommand):
+    help = ('Пропускная способность чтения ленты при одновременных '
+            'записях постов и комментариев в SQLite (на временных таблицах)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--seconds', type=float, default=5)
+        parser.add_argument(
+            '--profiles', nargs='+', default=['stock', 'tuned'],
+            choices=['stock', 'tuned'],
+            help='stock — настройки SQLite по умолчанию, '
+                 'tuned — settings.SQLITE_PRAGMAS',
+        )
+
+    def worker(self, action, stop, counters, lock, name):
+        try:
+            while not stop.is_set():
+                try:
+                    action()
+                    key = name
+                except OperationalError:
+                    key = f'{name}_errors'
+                with lock:
+                    counters[key] += 1
+        finally:
+            connection.close()
+
+    def create_scratch(self):
+        with connection.cursor() as cursor:
+            cursor.connection.executescript(SCRATCH_TABLES)
+            cursor.executemany(
+                'INSERT INTO load_post (text, pub_date) VALUES (%s, %s)',
+                [('Нагрузочный пост', time.time())] * SCRATCH_ROWS,
+            )
+
+    def drop_scratch(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TABLE IF EXISTS load_comment')
+            cursor.execute('DROP TABLE IF EXISTS load_post')
+
+    def run(self, pragmas, options):
+        connections.close_all()
+        with override_settings(SQLITE_PRAGMAS=pragmas):
+            connection.ensure_connection()
+
+            def read():
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        'SELECT id, text, pub_date FROM load_post '
+                        'ORDER BY pub_date DESC, id DESC LIMIT %s',
+                        [FEED_PAGE],
+                    )
+                    cursor.fetchall()
+
+            def write():
+                with transaction.atomic(), connection.cursor() as cursor:
+                    cursor.execute(
+                        'INSERT INTO load_post (text, pub_date) '
+                        'VALUES (%s, %s)', ['Нагрузочный пост', time.time()])
+                    cursor.execute(
+                        'INSERT INTO load_comment (post_id, text, created) '
+                        'VALUES (%s, %s, %s)',
+                        [cursor.lastrowid, 'Комментарий', time.time()])
+
+            stop, lock = threading.Event(), threading.Lock()
+            counters = Counter()
+            threads = [
+                threading.Thread(
+                    target=self.worker,
+                    args=(read, stop, counters, lock, 'reads'))
+                for _ in range(options['readers'])
+            ] + [
+                threading.Thread(
+                    target=self.worker,
+                    args=(write, stop, counters, lock, 'writes'))
+                for _ in range(options['writers'])
+            ]
+            started = time.monotonic()
+            for thread in threads:
+                thread.start()
+            time.sleep(options['seconds'])
+            stop.set()
+            for thread in threads:
+                thread.join()
+            elapsed = time.monotonic() - started
+            connections.close_all()
+        return {
+            'reads/s': round(counters['reads'] / elapsed, 1),
+            'writes/s': round(counters['writes'] / elapsed, 1),
+            'read errors': counters['reads_errors'],
+            'write errors': counters['writes_errors'],
+        }
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Команда замеряет только SQLite')
+        self.create_scratch()
+        try:
+            for profile in options['profiles']:
+                pragmas = STOCK_PRAGMAS
+                if profile == 'tuned':
+                    pragmas = settings.SQLITE_PRAGMAS
+                result = self.run(pragmas, options)
+                self.stdout.write(f'{profile:<8}' + '  '.join(
+                    f'{name}: {value}' for name, value in result.items()))
+        finally:
+            self.drop_scratch()
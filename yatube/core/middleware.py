@@ -0,0 +1,79 @@
+import json
+import logging
+import random
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import profiling, routers
+
+logger = logging.getLogger('core.profile')
+
+
+class ProfileMiddleware:
+    '''Считает SQL-запросы, их повторы, время БД и рендера шаблонов.
+
+    Профилируется доля PROFILE_SAMPLE_RATE запросов, при DEBUG — все.
+    Итог уходит в заголовок Server-Timing и строкой JSON в лог
+    core.profile.'''
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def sampled(self):
+        if settings.DEBUG:
+            return True
+        return random.random() < settings.PROFILE_SAMPLE_RATE
+
+    def __call__(self, request):
+        if not self.sampled():
+            return self.get_response(request)
+        profile = profiling.start()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(profile.execute))
+                response = self.get_response(request)
+        finally:
+            profiling.stop()
+        profile.finish()
+        response['Server-Timing'] = profile.server_timing()
+        match = request.resolver_match
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            **profile.as_dict(),
+        }, ensure_ascii=False))
+        return response
+
+
+class ReplicaStickinessMiddleware:
+    '''Read-your-writes для ReplicaRouter: пользователь, который что-то
+    записал, ещё REPLICA_STICKY_SECONDS читает из основной базы.
+    Метка хранится в cookie REPLICA_STICKY_COOKIE.'''
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+        cookie = settings.REPLICA_STICKY_COOKIE
+        routers.reset(pinned=cookie in request.COOKIES)
+        try:
+            response = self.get_response(request)
+            wrote = routers.wrote()
+        finally:
+            routers.reset()
+        if wrote:
+            response.set_cookie(
+                cookie, '1',
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
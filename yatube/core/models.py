@@ -23,3 +23,51 @@ class CreatedModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+class Job(models.Model):
+    '''Фоновая задача очереди core.jobs'''
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Не выполнена'),
+    )
+
+    name = models.CharField('Задача', max_length=100)
+    payload = models.TextField('Аргументы (JSON)', default='{}')
+    key = models.CharField(
+        'Ключ идемпотентности', max_length=200, blank=True, null=True)
+    status = models.CharField(
+        'Статус', max_length=10, choices=STATUSES, default=QUEUED)
+    attempts = models.PositiveIntegerField('Попыток', default=0)
+    max_attempts = models.PositiveIntegerField('Предел попыток')
+    run_at = models.DateTimeField('Выполнить не раньше')
+    locked_by = models.CharField('Воркер', max_length=100, blank=True)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created = models.DateTimeField('Создана', auto_now_add=True)
+    started = models.DateTimeField('Начата', null=True, blank=True)
+    finished = models.DateTimeField('Завершена', null=True, blank=True)
+    wait_ms = models.FloatField('Ожидание в очереди, мс', null=True)
+    duration_ms = models.FloatField('Длительность, мс', null=True)
+
+    class Meta:
+        verbose_name = 'Задача'
+        verbose_name_plural = 'Задачи'
+        indexes = [models.Index(fields=['status', 'run_at'])]
+        constraints = [
+            # Повторная постановка с тем же ключом, пока задача
+            # ещё ждёт в очереди, её не дублирует.
+            models.UniqueConstraint(
+                fields=['key'],
+                condition=models.Q(status='queued'),
+                name='unique_queued_job_key',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.name} ({self.get_status_display()})'
@@ -0,0 +1,90 @@
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+
+_local = threading.local()
+
+
+class RequestProfile:
+    '''Статистика одного запроса: SQL-запросы с длительностью
+    и время рендера шаблонов'''
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.finished = None
+        self.queries = []
+        self.template_time = 0.0
+        self.template_depth = 0
+
+    def execute(self, execute, sql, params, many, context):
+        '''Обёртка для connection.execute_wrapper'''
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - started))
+
+    def finish(self):
+        self.finished = time.perf_counter()
+
+    @property
+    def db_time(self):
+        return sum(duration for _, duration in self.queries)
+
+    @property
+    def total_time(self):
+        return (self.finished or time.perf_counter()) - self.started
+
+    @property
+    def repeated(self):
+        '''Одинаковый SQL, выполненный несколько раз, — признак N+1'''
+        counts = Counter(sql for sql, _ in self.queries)
+        return {sql: count for sql, count in counts.items() if count > 1}
+
+    @property
+    def duplicate_count(self):
+        return sum(count - 1 for count in self.repeated.values())
+
+    def as_dict(self):
+        data = {
+            'queries': len(self.queries),
+            'duplicates': self.duplicate_count,
+            'db_ms': round(self.db_time * 1000, 2),
+            'template_ms': round(self.template_time * 1000, 2),
+            'total_ms': round(self.total_time * 1000, 2),
+        }
+        if self.repeated:
+            sql, count = max(self.repeated.items(), key=lambda item: item[1])
+            data['top_duplicate'] = {'sql': sql, 'count': count}
+        return data
+
+    def server_timing(self):
+        '''Значение заголовка Server-Timing'''
+        data = self.as_dict()
+        return ', '.join([
+            f'db;dur={data["db_ms"]};desc="{data["queries"]} queries"',
+            f'dup;desc="{data["duplicates"]} duplicate queries"',
+            f'tpl;dur={data["template_ms"]}',
+            f'total;dur={data["total_ms"]}',
+        ])
+
+
+def current():
+    '''Профиль текущего запроса или None, если запрос не профилируется'''
+    return getattr(_local, 'profile', None)
+
+
+def shown():
+    '''Профиль для панели на странице: она выводится только при DEBUG'''
+    return current() if settings.DEBUG else None
+
+
+def start():
+    _local.profile = RequestProfile()
+    return _local.profile
+
+
+def stop():
+    _local.profile = None
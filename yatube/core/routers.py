@@ -0,0 +1,52 @@
+import random
+import threading
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_state = threading.local()
+
+
+def reset(pinned=False):
+    '''Начинает новый запрос: pinned — читать только из default'''
+    _state.pinned = pinned
+    _state.wrote = False
+
+
+def is_pinned():
+    '''Читает ли поток только из default'''
+    return getattr(_state, 'pinned', False)
+
+
+def wrote():
+    '''Была ли запись с последнего reset()'''
+    return getattr(_state, 'wrote', False)
+
+
+class ReplicaRouter:
+    '''Чтение — с реплик из DATABASE_REPLICAS, запись — в default.
+
+    После первой записи поток читает только из default, чтобы
+    не увидеть отставшую реплику; в следующих запросах закрепление
+    продлевает ReplicaStickinessMiddleware. Внутри транзакции
+    чтение тоже идёт в default.'''
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if (
+            not replicas
+            or is_pinned()
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        _state.pinned = _state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
@@ -0,0 +1,12 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class EagerJobsRunner(DiscoverRunner):
+    '''Тесты проверяют побочные эффекты записей сразу, поэтому задачи
+    core.jobs в них выполняются без воркеров. Тесты самой очереди
+    выключают это через override_settings.'''
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        settings.JOBS_ALWAYS_EAGER = True
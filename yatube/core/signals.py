@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+@receiver(connection_created)
+def tune_sqlite(sender, connection, **kwargs):
+    '''Применяет settings.SQLITE_PRAGMAS к каждому новому соединению
+    с SQLite: WAL, чтобы читатели не ждали писателей, и ожидание
+    блокировки вместо немедленного "database is locked"'''
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for pragma, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {pragma} = {value}')
@@ -0,0 +1,17 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from core.holes import marker
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def hole(context, template_name):
+    '''Персональный фрагмент страницы. Обычно работает как include,
+    а при отрисовке скелета для кеша страниц оставляет метку, которую
+    core.holes.fill заполняет на каждый запрос.'''
+    request = context.get('request')
+    if getattr(request, 'page_skeleton', False):
+        return mark_safe(marker(template_name))
+    return context.template.engine.get_template(template_name).render(context)
@@ -0,0 +1,88 @@
+import asyncio
+import threading
+
+from django.test import SimpleTestCase, override_settings
+
+from core import routers
+from core.asgi import WsgiToAsgi
+from core.concurrent import fetch
+
+
+def wsgi_app(environ, start_response):
+    start_response('201 Created', [('Content-Type', 'text/plain')])
+    body = environ['wsgi.input'].read()
+    # PATH_INFO по PEP 3333 — байты UTF-8, прочитанные как latin-1.
+    yield environ['PATH_INFO'].encode('latin1')
+    yield f'?{environ["QUERY_STRING"]}'.encode()
+    yield f'|{environ["HTTP_X_TOKEN"]}|'.encode() + body
+
+
+def call(app, scope, messages):
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    return sent
+
+
+class WsgiToAsgiTest(SimpleTestCase):
+    def setUp(self):
+        self.app = WsgiToAsgi(wsgi_app, workers=2)
+        self.addCleanup(self.app.executor.shutdown)
+
+    def test_request_and_streamed_response(self):
+        '''Тело запроса собирается из частей, ответ уходит кусками'''
+        sent = call(self.app, {
+            'type': 'http',
+            'method': 'POST',
+            'path': '/посты/',
+            'query_string': b'page=2',
+            'headers': [(b'x-token', b'abc')],
+        }, [
+            {'type': 'http.request', 'body': b'he', 'more_body': True},
+            {'type': 'http.request', 'body': b'llo'},
+        ])
+        self.assertEqual(sent[0], {
+            'type': 'http.response.start',
+            'status': 201,
+            'headers': [(b'content-type', b'text/plain')],
+        })
+        body = b''.join(message['body'] for message in sent[1:])
+        self.assertEqual(body.decode(), '/посты/?page=2|abc|hello')
+        self.assertEqual(len(sent), 5)
+        self.assertFalse(sent[-1].get('more_body', False))
+
+    def test_lifespan(self):
+        sent = call(self.app, {'type': 'lifespan'}, [
+            {'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'},
+        ])
+        self.assertEqual([message['type'] for message in sent], [
+            'lifespan.startup.complete', 'lifespan.shutdown.complete'])
+
+
+class FetchTest(SimpleTestCase):
+    def setUp(self):
+        routers.reset()
+        self.addCleanup(routers.reset)
+
+    def state(self):
+        return threading.current_thread(), routers.is_pinned()
+
+    def test_sequential_by_default(self):
+        '''Без VIEW_CONCURRENCY части выполняются в потоке запроса'''
+        parts = fetch(first=self.state, second=self.state)
+        self.assertEqual(parts['first'][0], threading.current_thread())
+
+    @override_settings(VIEW_CONCURRENCY=True)
+    def test_pool_keeps_pinning(self):
+        '''В пуле части видят закрепление запроса за основной базой'''
+        routers.reset(pinned=True)
+        parts = fetch(first=self.state, second=self.state)
+        self.assertNotEqual(parts['first'][0], threading.current_thread())
+        self.assertEqual(parts['first'][1], True)
+        self.assertEqual(parts['second'][1], True)
@@ -0,0 +1,142 @@
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+
+from core import cache as tiered_cache
+from core.cache import TieredCache
+
+User = get_user_model()
+
+
+def tiered(location, **options):
+    return TieredCache(location, {
+        'OPTIONS': {
+            'L2_BACKEND':
+                'django.core.cache.backends.filebased.FileBasedCache',
+            'SYNC_INTERVAL': 0,
+            **options,
+        },
+    })
+
+
+def process(location, **options):
+    '''Экземпляр кеша «другого процесса»: со своим L1'''
+    tiered_cache._tiers.pop(location, None)
+    return tiered(location, **options)
+
+
+class TieredCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.location, True)
+        self.addCleanup(tiered_cache._tiers.pop, self.location, None)
+        # Два «процесса» с общим файловым L2.
+        self.first = process(self.location)
+        self.second = process(self.location)
+
+    def test_l1_in_front_of_l2(self):
+        '''Повторное чтение обслуживает L1, промах считается'''
+        self.first.set('key', {'value': 1})
+        self.assertEqual(self.second.get('key'), {'value': 1})
+        self.assertEqual(self.second.get('key'), {'value': 1})
+        self.assertIsNone(self.second.get('missing'))
+        stats = self.second.stats()
+        self.assertEqual(
+            (stats['l2_hits'], stats['l1_hits'], stats['misses']), (1, 1, 1))
+
+    def test_l1_returns_copies(self):
+        self.first.set('key', [1])
+        self.first.get('key').append(2)
+        self.assertEqual(self.first.get('key'), [1])
+
+    def test_invalidation_is_broadcast(self):
+        '''Запись и удаление в одном процессе выбрасывают ключ
+        из L1 другого'''
+        self.first.set_many({'stamp': 1, 'other': 1})
+        self.assertEqual(self.second.get_many(['stamp', 'other']),
+                         {'stamp': 1, 'other': 1})
+        self.first.set_many({'stamp': 2})
+        self.assertEqual(self.second.get('stamp'), 2)
+        self.first.incr('stamp')
+        self.assertEqual(self.second.get('stamp'), 3)
+        self.first.delete('other')
+        self.assertIsNone(self.second.get('other'))
+        self.assertEqual(self.second.stats()['invalidations'], 3)
+
+    def test_lagging_process_resyncs(self):
+        '''Процесс, отставший больше чем на журнал, очищает L1'''
+        first = process(self.location, JOURNAL_SIZE=2)
+        second = process(self.location, JOURNAL_SIZE=2)
+        first.set('key', 1)
+        self.assertEqual(second.get('key'), 1)
+        for value in range(2, 6):
+            first.set('key', value)
+        self.assertEqual(second.get('key'), 5)
+        self.assertEqual(second.stats()['resyncs'], 1)
+
+    def test_concurrent_writers_keep_journal(self):
+        '''Параллельные писатели получают разные номера журнала:
+        ни одна инвалидация не теряется'''
+        keys = [f'key{number}' for number in range(200)]
+        self.first.set_many(dict.fromkeys(keys, 0))
+        self.assertEqual(self.second.get_many(keys), dict.fromkeys(keys, 0))
+        head = self.second.journal.head()
+        writers = [process(self.location) for _ in range(4)]
+
+        def write(number):
+            writers[number % 4].set(keys[number], 1)
+
+        with ThreadPoolExecutor(4) as pool:
+            list(pool.map(write, range(len(keys))))
+        self.assertEqual(self.second.journal.head(), head + len(keys))
+        self.assertEqual(self.second.get_many(keys), dict.fromkeys(keys, 1))
+        self.assertEqual(self.second.stats()['resyncs'], 0)
+
+    def test_clear_is_broadcast(self):
+        '''Очистка кеша в одном процессе очищает L1 остальных'''
+        self.first.set('key', 1)
+        self.assertEqual(self.second.get('key'), 1)
+        self.first.clear()
+        self.assertIsNone(self.second.get('key'))
+
+    def test_threads_share_l1(self):
+        '''Экземпляры кеша потоков одного процесса делят L1
+        и счётчики'''
+        thread = tiered(self.location)
+        self.second.set('key', 1)
+        self.assertEqual(thread.get('key'), 1)
+        self.assertEqual(thread.stats(), self.second.stats())
+        self.assertEqual(self.second.stats()['l1_hits'], 1)
+
+    def test_concurrent_incr(self):
+        '''incr файлового L2 из разных процессов не теряет прибавок'''
+        self.first.set('counter', 0)
+        writers = [process(self.location) for _ in range(4)]
+
+        def increment(number):
+            writers[number % 4].incr('counter')
+
+        with ThreadPoolExecutor(4) as pool:
+            list(pool.map(increment, range(200)))
+        self.assertEqual(self.second.get('counter'), 200)
+
+    def test_lru_eviction(self):
+        cache = process(self.location, L1_MAX_ENTRIES=2)
+        for key in ('a', 'b', 'c'):
+            cache.set(key, key)
+        self.assertEqual(cache.stats()['evictions'], 1)
+        self.assertEqual(cache.stats()['l1_size'], 2)
+        self.assertEqual(cache.get('a'), 'a')
+        self.assertEqual(cache.stats()['l2_hits'], 1)
+
+
+class CacheStatsViewTest(TestCase):
+    def test_staff_only(self):
+        response = self.client.get('/cache-stats/')
+        self.assertEqual(response.status_code, 302)
+        admin = User.objects.create_superuser('admin', 'a@a.ru', 'pass')
+        self.client.force_login(admin)
+        self.assertIn('l1_hits', self.client.get('/cache-stats/').json())
@@ -0,0 +1,88 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core import jobs
+from core.models import Job
+from posts.models import Follow, Post, TimelineEntry, User
+
+calls = []
+
+
+@jobs.task('tests.record')
+def record(value):
+    calls.append(value)
+
+
+@jobs.task('tests.broken')
+def broken():
+    raise RuntimeError('сломано')
+
+
+@override_settings(JOBS_ALWAYS_EAGER=False)
+class JobQueueTest(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_eager_runs_inline(self):
+        '''При JOBS_ALWAYS_EAGER задача выполняется сразу'''
+        with self.settings(JOBS_ALWAYS_EAGER=True):
+            self.assertIsNone(jobs.enqueue('tests.record', value=1))
+        self.assertEqual(calls, [1])
+        self.assertFalse(Job.objects.exists())
+
+    def test_key_deduplicates_queued(self):
+        '''Тот же ключ, пока задача в очереди, её не дублирует'''
+        first = jobs.enqueue('tests.record', key='k', value=1)
+        second = jobs.enqueue('tests.record', key='k', value=2)
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(jobs.work(burst=True), 1)
+        self.assertEqual(calls, [1])
+        jobs.enqueue('tests.record', key='k', value=3)
+        jobs.work(burst=True)
+        self.assertEqual(calls, [1, 3])
+
+    def test_retries_with_backoff(self):
+        '''Упавшая задача откладывается и после предела попыток
+        помечается ошибкой; метрики считают повторы'''
+        job = jobs.enqueue('tests.broken', max_attempts=2)
+        with self.assertLogs('core.jobs', 'ERROR'):
+            jobs.work(burst=True)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn('сломано', job.last_error)
+        self.assertEqual(jobs.work(burst=True), 0)
+        Job.objects.update(run_at=timezone.now())
+        with self.assertLogs('core.jobs', 'ERROR'):
+            jobs.work(burst=True)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+        self.assertEqual(jobs.metrics()['tests.broken']['retries'], 1)
+
+    def test_stale_jobs_requeued(self):
+        '''Задачу погибшего воркера подхватывает другой'''
+        job = jobs.enqueue('tests.record', value=1)
+        jobs.claim('dead', 1)
+        Job.objects.filter(pk=job.pk).update(
+            started=timezone.now() - timedelta(days=1))
+        jobs.work(burst=True)
+        self.assertEqual(calls, [1])
+
+    def test_post_side_effects_are_jobs(self):
+        '''Раскладка поста по лентам ждёт воркера'''
+        author = User.objects.create(username='author')
+        reader = User.objects.create(username='reader')
+        Follow.objects.create(user=reader, author=author)
+        post = Post.objects.create(author=author, text='Пост')
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        out = StringIO()
+        call_command('run_workers', burst=True, stdout=out)
+        self.assertIn('Выполнено задач: 3', out.getvalue())
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=reader, post=post).exists())
+        call_command('run_workers', metrics=True, stdout=out)
+        self.assertIn('posts.fan_out', out.getvalue())
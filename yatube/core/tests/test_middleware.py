@@ -0,0 +1,45 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from core.profiling import RequestProfile
+
+
+class ProfileMiddlewareTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(PROFILE_SAMPLE_RATE=1)
+    def test_server_timing_and_log(self):
+        '''Профилируемый запрос получает Server-Timing и строку в логе'''
+        with self.assertLogs('core.profile', 'INFO') as logs:
+            response = self.client.get('/')
+        timing = response['Server-Timing']
+        for metric in ('db;dur=', 'dup;desc=', 'tpl;dur=', 'total;dur='):
+            with self.subTest(metric=metric):
+                self.assertIn(metric, timing)
+        self.assertIn('"view": "posts:index"', logs.output[0])
+
+    @override_settings(PROFILE_SAMPLE_RATE=0)
+    def test_not_sampled(self):
+        '''Без выборки запрос не профилируется'''
+        response = self.client.get('/')
+        self.assertFalse(response.has_header('Server-Timing'))
+        self.assertNotContains(response, 'profile-overlay')
+
+    @override_settings(DEBUG=True)
+    def test_debug_overlay(self):
+        '''При DEBUG внизу страницы выводится сводка по SQL'''
+        with self.assertLogs('core.profile', 'INFO'):
+            response = self.client.get('/')
+        self.assertContains(response, 'profile-overlay')
+
+    def test_duplicates(self):
+        '''Повторяющийся SQL считается дубликатом'''
+        profile = RequestProfile()
+        for sql in ('SELECT 1', 'SELECT 2', 'SELECT 2', 'SELECT 2'):
+            profile.execute(lambda *args: None, sql, (), False, {})
+        self.assertEqual(profile.duplicate_count, 2)
+        self.assertEqual(
+            profile.as_dict()['top_duplicate'],
+            {'sql': 'SELECT 2', 'count': 3},
+        )
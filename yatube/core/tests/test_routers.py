@@ -0,0 +1,56 @@
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core import routers
+from core.middleware import ReplicaStickinessMiddleware
+from posts.models import Post
+
+router = routers.ReplicaRouter()
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTest(SimpleTestCase):
+    def setUp(self):
+        routers.reset()
+        self.addCleanup(routers.reset)
+
+    def test_reads_go_to_replica_until_write(self):
+        '''Чтение с реплики, после записи — из основной базы'''
+        self.assertEqual(router.db_for_read(Post), 'replica')
+        self.assertEqual(router.db_for_write(Post), 'default')
+        self.assertEqual(router.db_for_read(Post), 'default')
+
+    def test_no_migrations_on_replica(self):
+        self.assertFalse(router.allow_migrate('replica', 'posts'))
+        self.assertTrue(router.allow_migrate('default', 'posts'))
+
+    def view(self, read_from, write=False):
+        def get_response(request):
+            if write:
+                router.db_for_write(Post)
+            read_from.append(router.db_for_read(Post))
+            return HttpResponse()
+        return ReplicaStickinessMiddleware(get_response)
+
+    def test_read_your_writes(self):
+        '''После записи ответ ставит cookie, и запросы с ней
+        читают из основной базы'''
+        factory, read_from = RequestFactory(), []
+        response = self.view(read_from, write=True)(factory.post('/'))
+        cookie = response.cookies['read_primary']
+        self.assertEqual(cookie['max-age'], 10)
+        self.assertEqual(
+            self.view(read_from)(factory.get('/')).cookies.get(
+                'read_primary'), None)
+        request = factory.get('/')
+        request.COOKIES['read_primary'] = '1'
+        self.view(read_from)(request)
+        self.assertEqual(read_from, ['default', 'replica', 'default'])
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas(self):
+        '''Без реплик всё идёт в default и cookie не ставится'''
+        read_from = []
+        response = self.view(read_from, write=True)(RequestFactory().post('/'))
+        self.assertNotIn('read_primary', response.cookies)
+        self.assertEqual(router.db_for_read(Post), 'default')
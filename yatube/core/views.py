@@ -1,3 +1,6 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.cache import cache
+from django.http import JsonResponse
 from django.shortcuts import render
 
 
@@ -15,3 +18,10 @@ def permission_denied(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+@staff_member_required
+def cache_stats(request):
+    '''Счётчики кеша процесса, который обработал запрос'''
+    stats = getattr(cache, 'stats', None)
+    return JsonResponse(stats() if stats else {})
@@ -1,5 +1,7 @@
 from django.contrib import admin
+from .constants import SEARCH_ADMIN_LIMIT
 from .models import Post, Group, Comment
+from .search import SearchResults
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -9,6 +11,13 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        '''Поиск по индексу вместо LIKE по всей таблице постов'''
+        if not search_term:
+            return queryset, False
+        ids = SearchResults(search_term).ranked_ids(limit=SEARCH_ADMIN_LIMIT)
+        return queryset.filter(pk__in=ids), False
+
 
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group)
@@ -0,0 +1,136 @@
+import json
+from itertools import islice
+
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.views.decorators.http import require_GET
+
+from .constants import API_CHUNK_SIZE, API_MAX_PER_PAGE, API_PER_PAGE
+from .models import Group, Post, User
+from .timeline import timeline_posts
+from .utils import (
+    CursorPaginator, decode_cursor, encode_cursor, get_group_or_404
+)
+
+POST_FIELDS = ('text', 'pub_date', 'image', 'author', 'group')
+AUTHOR_FIELDS = ('username', 'first_name', 'last_name')
+GROUP_FIELDS = ('slug', 'title')
+
+
+def error(status, detail):
+    return JsonResponse({'detail': detail}, status=status)
+
+
+def get_limit(request):
+    '''Размер страницы из ?limit=, не больше API_MAX_PER_PAGE'''
+    try:
+        limit = int(request.GET.get('limit', API_PER_PAGE))
+    except ValueError:
+        return API_PER_PAGE
+    return min(max(limit, 1), API_MAX_PER_PAGE)
+
+
+class Related:
+    '''Авторы и группы постов: недостающие дочитываются одним
+    запросом на порцию постов и запоминаются до конца ответа'''
+
+    def __init__(self, model, fields):
+        self.queryset = model.objects.only(*fields)
+        self.objects = {}
+
+    def load(self, ids):
+        missing = {pk for pk in ids if pk is not None} - self.objects.keys()
+        if missing:
+            self.objects.update(self.queryset.in_bulk(missing))
+
+    def get(self, pk):
+        return self.objects.get(pk)
+
+
+def serialize(post, authors, groups):
+    author = authors.get(post.author_id)
+    group = groups.get(post.group_id)
+    return {
+        'id': post.pk,
+        'text': post.text,
+        'pub_date': post.pub_date.isoformat(),
+        'url': reverse('posts:post_detail', args=[post.pk]),
+        'image': post.image.url if post.image else None,
+        'author': {
+            'username': author.username,
+            'full_name': author.get_full_name(),
+        },
+        'group': group and {'slug': group.slug, 'title': group.title},
+    }
+
+
+def stream_posts(queryset, after, limit):
+    '''Куски JSON страницы постов. Посты читаются курсором БД
+    порциями по API_CHUNK_SIZE, авторы и группы — пачкой на порцию;
+    целиком страница в памяти не собирается.'''
+    paginator = CursorPaginator(queryset.only(*POST_FIELDS), limit)
+    rows = paginator.ordered(after)[:limit + 1].iterator(
+        chunk_size=API_CHUNK_SIZE)
+    authors = Related(User, AUTHOR_FIELDS)
+    groups = Related(Group, GROUP_FIELDS)
+    yield '{"results": ['
+    sent, last, more = 0, None, False
+    while True:
+        chunk = list(islice(rows, API_CHUNK_SIZE))
+        if sent + len(chunk) > limit:
+            chunk, more = chunk[:limit - sent], True
+        if not chunk:
+            break
+        authors.load(post.author_id for post in chunk)
+        groups.load(post.group_id for post in chunk)
+        for post in chunk:
+            prefix = ', ' if sent else ''
+            yield prefix + json.dumps(
+                serialize(post, authors, groups), ensure_ascii=False)
+            sent += 1
+        last = chunk[-1]
+        if more:
+            break
+    cursor = encode_cursor(last.pub_date, last.pk) if more else None
+    yield '], "next": ' + json.dumps(cursor) + '}'
+
+
+def posts_response(request, queryset):
+    return StreamingHttpResponse(
+        stream_posts(
+            queryset,
+            decode_cursor(request.GET.get('after')),
+            get_limit(request),
+        ),
+        content_type='application/json',
+    )
+
+
+@require_GET
+def posts(request):
+    return posts_response(request, Post.objects.all())
+
+
+@require_GET
+def group_posts(request, slug):
+    try:
+        group = get_group_or_404(slug)
+    except Http404:
+        return error(404, 'Группа не найдена')
+    return posts_response(request, group.posts.all())
+
+
+@require_GET
+def user_posts(request, username):
+    author_id = User.objects.filter(
+        username=username).values_list('pk', flat=True).first()
+    if author_id is None:
+        return error(404, 'Пользователь не найден')
+    return posts_response(request, Post.objects.filter(author_id=author_id))
+
+
+@require_GET
+def feed(request):
+    if not request.user.is_authenticated:
+        return error(401, 'Требуется вход')
+    return posts_response(request, timeline_posts(request.user))
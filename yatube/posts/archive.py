@@ -0,0 +1,70 @@
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .constants import ARCHIVE_BATCH_SIZE
+from .models import ArchivedComment, ArchivedPost, Comment, Post
+from .utils import post_author_key
+
+_state = threading.local()
+
+
+@contextmanager
+def archiving():
+    '''Пока посты переезжают в архив, сигналы удаления не уменьшают
+    счётчики постов и комментариев пользователей: записи никуда
+    не пропадают, а только меняют таблицу. Из поискового индекса
+    посты при этом удаляются: поиск идёт только по живым постам.'''
+    _state.active = True
+    try:
+        yield
+    finally:
+        _state.active = False
+
+
+def in_progress():
+    return getattr(_state, 'active', False)
+
+
+def archive_batch(ids):
+    '''Переносит посты с комментариями в архив одной транзакцией'''
+    with transaction.atomic(), archiving():
+        ArchivedPost.objects.bulk_create(
+            ArchivedPost(
+                id=post.pk, text=post.text, pub_date=post.pub_date,
+                author_id=post.author_id, group_id=post.group_id,
+                image=post.image.name,
+            )
+            for post in Post.objects.filter(pk__in=ids)
+        )
+        ArchivedComment.objects.bulk_create(
+            ArchivedComment(
+                id=comment.pk, post_id=comment.post_id,
+                author_id=comment.author_id, text=comment.text,
+                created=comment.created,
+            )
+            for comment in Comment.objects.filter(post_id__in=ids)
+        )
+        Post.objects.filter(pk__in=ids).delete()
+    cache.delete_many([post_author_key(pk) for pk in ids])
+
+
+def archive_posts(older_than_days, batch_size=ARCHIVE_BATCH_SIZE,
+                  report=None):
+    '''Переносит в архив посты старше older_than_days дней,
+    от самых старых. Возвращает число перенесённых постов.'''
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    done = 0
+    while True:
+        ids = list(Post.objects.filter(pub_date__lt=cutoff).order_by(
+            'pub_date', 'pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return done
+        archive_batch(ids)
+        done += len(ids)
+        if report:
+            report(done)
@@ -0,0 +1,238 @@
+import asyncio
+import json
+import math
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.asgi import WsgiToAsgi
+from .models import Group, User
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(values, rank):
+    '''Перцентиль методом ближайшего ранга'''
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(rank / 100 * len(ordered)) - 1)]
+
+
+def targets():
+    '''Адреса из posts/urls.py: (имя, URL, нужен ли вход).
+    Читатель — самый активный автор: у него есть лента подписок
+    и собственные посты для страницы редактирования. Подписка
+    и отписка не замеряются: GET по ним меняет данные.'''
+    reader = User.objects.annotate(
+        total=Count('posts')).order_by('-total', 'pk').first()
+    post = reader.posts.order_by('-pub_date', '-pk').first()
+    group = Group.objects.order_by('pk').first()
+    word = post.text.split()[0] if post else 'пост'
+    urls = [
+        ('index', reverse('posts:index'), False),
+        ('search', reverse('posts:search') + f'?q={word}', False),
+        ('profile', reverse('posts:profile', args=[reader.username]), False),
+        ('follow_index', reverse('posts:follow_index'), True),
+        ('post_create', reverse('posts:post_create'), True),
+    ]
+    if group:
+        urls.append(('group_list', reverse(
+            'posts:group_list', args=[group.slug]), False))
+    if post:
+        urls += [
+            ('post_detail', reverse('posts:post_detail', args=[post.pk]),
+             False),
+            ('post_comments', reverse('posts:post_comments', args=[post.pk]),
+             False),
+            ('post_edit', reverse('posts:post_edit', args=[post.pk]), True),
+            ('add_comment', reverse('posts:add_comment', args=[post.pk]),
+             True),
+        ]
+    return reader, urls
+
+
+def measure(client, url, requests, warmup):
+    '''Запросы считаются по всем базам: чтения могут уйти в реплику'''
+    for _ in range(warmup):
+        client.get(url)
+    timings, queries = [], []
+    for _ in range(requests):
+        with ExitStack() as stack:
+            captured = [
+                stack.enter_context(CaptureQueriesContext(connection))
+                for connection in connections.all()
+            ]
+            started = time.perf_counter()
+            response = client.get(url)
+            timings.append((time.perf_counter() - started) * 1000)
+        queries.append(sum(len(context) for context in captured))
+    tracemalloc.start()
+    client.get(url)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    result = {'status': response.status_code}
+    for rank in PERCENTILES:
+        result[f'p{rank}_ms'] = round(percentile(timings, rank), 2)
+    result['queries'] = max(queries)
+    result['memory_kb'] = round(peak / 1024, 1)
+    return result
+
+
+def run(requests=50, warmup=5):
+    '''Прогоняет каждый адрес через тестовый клиент: задержки,
+    запросы к БД и пик памяти на запрос'''
+    reader, urls = targets()
+    anonymous, member = Client(), Client()
+    member.force_login(reader)
+    results = {}
+    with override_settings(DEBUG=False, PROFILE_SAMPLE_RATE=0):
+        for name, url, login in urls:
+            client = member if login else anonymous
+            results[name] = measure(client, url, requests, warmup)
+    return results
+
+
+# Страницы чтения, на которых сравниваются WSGI и ASGI.
+SERVER_TARGETS = (
+    'index', 'group_list', 'profile', 'post_detail', 'follow_index')
+
+
+def http_scope(url, cookie=''):
+    path, _, query = url.partition('?')
+    headers = [(b'host', b'testserver')]
+    if cookie:
+        headers.append((b'cookie', cookie.encode()))
+    return {
+        'type': 'http',
+        'method': 'GET',
+        'path': path,
+        'query_string': query.encode(),
+        'headers': headers,
+        'http_version': '1.1',
+        'scheme': 'http',
+        'server': ('testserver', 80),
+    }
+
+
+async def asgi_get(app, scope):
+    status = None
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+
+    await app(scope, receive, send)
+    return status
+
+
+def wsgi_get(handler, environ):
+    status = None
+
+    def start_response(line, headers, exc_info=None):
+        nonlocal status
+        status = int(line.split(' ', 1)[0])
+
+    result = handler(environ, start_response)
+    try:
+        for _ in result:
+            pass
+    finally:
+        result.close()
+    return status
+
+
+async def drive(mode, scopes, clients, requests, workers):
+    '''clients одновременных клиентов делают requests запросов
+    по кругу адресов; обработчик — пул из workers потоков'''
+    handler = get_wsgi_application()
+    adapter = WsgiToAsgi(handler, workers)
+    pool = ThreadPoolExecutor(max_workers=workers)
+    loop = asyncio.get_running_loop()
+    timings, errors = [], 0
+
+    async def client(number):
+        nonlocal errors
+        for index in range(number, requests, clients):
+            scope = scopes[index % len(scopes)]
+            started = time.perf_counter()
+            if mode == 'asgi':
+                status = await asgi_get(adapter, scope)
+            else:
+                status = await loop.run_in_executor(
+                    pool, wsgi_get, handler,
+                    adapter.environ(scope, b''))
+            timings.append((time.perf_counter() - started) * 1000)
+            errors += status != 200
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(number) for number in range(clients)))
+    elapsed = time.perf_counter() - started
+    pool.shutdown()
+    adapter.executor.shutdown()
+    return {
+        'rps': round(len(timings) / elapsed, 1),
+        'p50_ms': round(percentile(timings, 50), 2),
+        'p95_ms': round(percentile(timings, 95), 2),
+        'errors': errors,
+    }
+
+
+def compare_servers(clients=16, requests=400, workers=4):
+    '''Пропускная способность страниц чтения через WSGI-обработчик
+    и через yatube/asgi.py с одновременной загрузкой частей страниц
+    (VIEW_CONCURRENCY) при одинаковом числе потоков обработчика'''
+    reader, urls = targets()
+    member = Client()
+    member.force_login(reader)
+    cookie = f'sessionid={member.cookies["sessionid"].value}'
+    scopes = [
+        http_scope(url, cookie if login else '')
+        for name, url, login in urls if name in SERVER_TARGETS
+    ]
+    results = {}
+    for mode, concurrency in (('wsgi', False), ('asgi', True)):
+        with override_settings(
+            DEBUG=False, PROFILE_SAMPLE_RATE=0,
+            VIEW_CONCURRENCY=concurrency,
+        ):
+            results[mode] = asyncio.run(
+                drive(mode, scopes, clients, requests, workers))
+    return results
+
+
+def compare(results, baseline, tolerance=0.2):
+    '''Регрессии относительно сохранённого прогона: рост p95 больше
+    чем на tolerance и любой рост числа запросов'''
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if result['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+            regressions.append(
+                f'{name}: p95 {base["p95_ms"]} -> {result["p95_ms"]} мс')
+        if result['queries'] > base['queries']:
+            regressions.append(
+                f'{name}: запросов {base["queries"]} -> {result["queries"]}')
+    return regressions
+
+
+def load(path):
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def save(results, path):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(results, file, ensure_ascii=False, indent=2, sort_keys=True)
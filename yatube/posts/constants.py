@@ -1,3 +1,66 @@
 PER_PAGE = 10
 
+COMMENTS_PER_PAGE = 20
+
 TEXT_POST = 15
+
+# Лента подписок: сколько последних постов автора добавлять при подписке,
+# размер пачки bulk_create и число подписчиков, начиная с которого посты
+# автора не раскладываются по лентам, а подтягиваются при чтении.
+TIMELINE_BACKFILL = 1000
+TIMELINE_BATCH_SIZE = 500
+FANOUT_FOLLOWERS_LIMIT = 1000
+
+# Кеш размеров выборок для пагинатора: время жизни счётчиков по тексту
+# запроса и по именованным областям, порог, начиная с которого точный
+# COUNT(*) заменяется оценкой, и ширина окна номеров страниц.
+COUNT_CACHE_TIMEOUT = 60
+COUNT_SCOPE_TIMEOUT = 60 * 60
+COUNT_ESTIMATE_THRESHOLD = 100000
+PAGE_WINDOW = 3
+
+# Группы меняются редко: поиск группы по slug кешируется на сутки.
+GROUP_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Фрагменты лент сбрасываются сигналами, срок жизни лишь страховка.
+FEED_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Страницы целиком (для гостей) и их скелеты с метками персональных
+# фрагментов (для вошедших); ключ включает версии областей.
+PAGE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Множества id подписок и подписчиков обновляются сигналами Follow.
+FOLLOW_CACHE_TIMEOUT = 60 * 60
+
+# Размеры миниатюр, которые заранее режутся для каждой картинки поста;
+# должны совпадать с тегами {% thumbnail %} в шаблонах.
+THUMBNAIL_GEOMETRIES = (
+    ('960x339', {'crop': 'center', 'upscale': True}),
+)
+
+# Поиск: вес слова из текста поста и из комментариев, длина слова
+# в индексе, предел числа слов запроса и выдачи для админки.
+SEARCH_TEXT_WEIGHT = 2
+SEARCH_COMMENT_WEIGHT = 1
+SEARCH_TERM_LENGTH = 64
+SEARCH_MAX_TERMS = 10
+SEARCH_ADMIN_LIMIT = 1000
+
+# JSON API: размер страницы по умолчанию и предел для ?limit=,
+# а также порция постов, для которой разом читаются авторы и группы.
+API_PER_PAGE = 20
+API_MAX_PER_PAGE = 500
+API_CHUNK_SIZE = 100
+
+# Уведомления: подписчиков на задачу раскладки, окно, за которое
+# посты копятся в одну сводку, пользователей на пачку писем
+# и предел постов в одном письме.
+NOTIFY_CHUNK_SIZE = 1000
+DIGEST_DELAY = 15 * 60
+DIGEST_BATCH_SIZE = 100
+DIGEST_MAX_POSTS = 20
+
+# Архив: посты старше ARCHIVE_AFTER_DAYS дней переносятся из горячей
+# таблицы пачками по ARCHIVE_BATCH_SIZE.
+ARCHIVE_AFTER_DAYS = 365
+ARCHIVE_BATCH_SIZE = 500
@@ -0,0 +1,91 @@
+import hashlib
+
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+
+from .constants import (
+    COUNT_CACHE_TIMEOUT, COUNT_ESTIMATE_THRESHOLD, COUNT_SCOPE_TIMEOUT
+)
+
+
+def scope_key(scope):
+    return f'posts:count:{scope}'
+
+
+def signature_key(queryset):
+    try:
+        sql = str(queryset.query)
+    except EmptyResultSet:
+        return None
+    return 'posts:count:sql:' + hashlib.md5(sql.encode()).hexdigest()
+
+
+def post_scopes(post):
+    '''Области подсчёта, в которые входит пост'''
+    scopes = ['all', f'author:{post.author_id}']
+    if post.group_id:
+        scopes.append(f'group:{post.group_id}')
+    return scopes
+
+
+def adjust(scopes, delta):
+    '''Поправляет закешированные счётчики, не создавая новых'''
+    for scope in scopes:
+        try:
+            cache.incr(scope_key(scope), delta)
+        except ValueError:
+            pass
+
+
+def estimate_count(queryset):
+    '''Быстрая оценка размера выборки или None, если оценить нельзя'''
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+            return cursor.fetchone()[0][0]['Plan']['Plan Rows']
+    if not queryset.query.where:
+        # Без фильтров оценкой служит наибольший id (по индексу PK).
+        return queryset.order_by('-pk').values_list(
+            'pk', flat=True).first() or 0
+    return None
+
+
+class CountProvider:
+    '''Кеширует размер выборки для пагинатора.
+
+    Счётчики именованных областей (scope) поддерживаются сигналами
+    создания и удаления постов и живут COUNT_SCOPE_TIMEOUT секунд;
+    прочие выборки кешируются по тексту SQL-запроса
+    на COUNT_CACHE_TIMEOUT секунд.'''
+
+    def __init__(self, scope=None, estimate=True):
+        self.scope = scope
+        self.estimate = estimate
+
+    def count(self, queryset):
+        if self.scope:
+            key, timeout = scope_key(self.scope), COUNT_SCOPE_TIMEOUT
+        else:
+            key, timeout = signature_key(queryset), COUNT_CACHE_TIMEOUT
+        if key is None:
+            return 0
+        value = cache.get(key)
+        if value is None:
+            value = estimate_count(queryset) if self.estimate else None
+            if value is None or value < COUNT_ESTIMATE_THRESHOLD:
+                value = queryset.count()
+            cache.set(key, value, timeout)
+        return value
+
+
+class KnownCount:
+    '''Размер выборки, известный заранее (например, из UserStats)'''
+
+    def __init__(self, value):
+        self.value = value
+
+    def count(self, queryset):
+        return self.value
@@ -0,0 +1,56 @@
+from functools import wraps
+
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .models import Post
+
+POST_FIELDS = ('text', 'pub_date', 'image')
+AUTHOR_FIELDS = ('author__username', 'author__first_name', 'author__last_name')
+
+# Поля, которые шаблон каждой ленты читает у поста и связанных моделей.
+FEED_FIELDS = {
+    'index': POST_FIELDS + AUTHOR_FIELDS + ('group__slug',),
+    'group': POST_FIELDS + AUTHOR_FIELDS + ('group',),
+    'profile': POST_FIELDS + AUTHOR_FIELDS + ('group__slug',),
+    'follow': POST_FIELDS + AUTHOR_FIELDS + ('group__slug',),
+    'search': POST_FIELDS + AUTHOR_FIELDS + ('group__slug',),
+}
+
+COMMENT_FIELDS = ('text', 'created', 'post', 'author__username')
+
+
+def feed_queryset(kind, queryset=None):
+    '''Выборка постов для ленты kind: связанные объекты подтягиваются
+    одним JOIN, читаются только нужные шаблону поля'''
+    if queryset is None:
+        queryset = Post.objects.all()
+    fields = FEED_FIELDS[kind]
+    related = {field.split('__')[0] for field in fields if '__' in field}
+    return queryset.select_related(*related).only(*fields)
+
+
+def comment_queryset(post):
+    '''Комментарии поста вместе с авторами одним запросом'''
+    return post.comments.select_related('author').only(*COMMENT_FIELDS)
+
+
+def query_budget(view):
+    '''Падает, если вью ленты выполнила больше settings.FEED_QUERY_BUDGET
+    запросов. Включается в тестах, по умолчанию ничего не делает.'''
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        budget = getattr(settings, 'FEED_QUERY_BUDGET', None)
+        if budget is None:
+            return view(request, *args, **kwargs)
+        with CaptureQueriesContext(connection) as queries:
+            response = view(request, *args, **kwargs)
+        if len(queries) > budget:
+            raise AssertionError(
+                f'{view.__name__}: {len(queries)} запросов к БД '
+                f'при бюджете {budget}:\n'
+                + '\n'.join(query['sql'] for query in queries)
+            )
+        return response
+    return wrapper
@@ -0,0 +1,70 @@
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+
+from .constants import FOLLOW_CACHE_TIMEOUT
+from .models import Follow
+
+
+def following_key(user_id):
+    return f'posts:following:{user_id}'
+
+
+def followers_key(author_id):
+    return f'posts:followers:{author_id}'
+
+
+def _cached_ids(key, **lookup):
+    ids = cache.get(key)
+    if ids is None:
+        field = 'author_id' if 'user_id' in lookup else 'user_id'
+        ids = frozenset(
+            Follow.objects.filter(**lookup).values_list(field, flat=True)
+        )
+        cache.set(key, ids, FOLLOW_CACHE_TIMEOUT)
+    return ids
+
+
+def following_ids(user_id):
+    '''id авторов, на которых подписан пользователь'''
+    return _cached_ids(following_key(user_id), user_id=user_id)
+
+
+def follower_ids(author_id):
+    '''id подписчиков автора'''
+    return _cached_ids(followers_key(author_id), author_id=author_id)
+
+
+def is_following(user, authors):
+    '''Подписан ли пользователь на каждого из авторов:
+    словарь {id автора: bool} за одно обращение к кешу'''
+    if not user.is_authenticated:
+        return {author.pk: False for author in authors}
+    followed = following_ids(user.pk)
+    return {author.pk: author.pk in followed for author in authors}
+
+
+def invalidate(follow):
+    '''Сбрасывает закешированные множества после коммита изменения
+    подписки. Удаление, а не правка множества: правка по прочитанному
+    значению теряет параллельные изменения, а до коммита другой
+    запрос успел бы закешировать старый набор.'''
+    keys = [following_key(follow.user_id), followers_key(follow.author_id)]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def follow(user, author):
+    '''Подписывает пользователя на автора; повторная подписка
+    и подписка на себя ничего не делают'''
+    if user == author:
+        return False
+    try:
+        with transaction.atomic():
+            Follow.objects.create(user=user, author=author)
+    except IntegrityError:
+        return False
+    return True
+
+
+def unfollow(user, author):
+    deleted, _ = Follow.objects.filter(user=user, author=author).delete()
+    return bool(deleted)
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from posts import archive
+from posts.constants import ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = ('Переносит старые посты с комментариями из горячих таблиц '
+            'в архивные; страницы поста и профиля читают их оттуда')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than-days', type=int, default=ARCHIVE_AFTER_DAYS)
+        parser.add_argument(
+            '--batch-size', type=int, default=ARCHIVE_BATCH_SIZE)
+
+    def report(self, done):
+        self.stdout.write(f'В архиве: {done}', ending='\r')
+
+    def handle(self, *args, **options):
+        done = archive.archive_posts(
+            options['older_than_days'], options['batch_size'], self.report)
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(
+            f'Перенесено постов: {done}'))
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = ('Замеряет p50/p95/p99, число запросов и память для адресов '
+            'posts/urls.py и сравнивает с сохранённым прогоном')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument(
+            '--baseline', help='JSON прошлого прогона для сравнения')
+        parser.add_argument('--save', help='Куда сохранить результаты')
+        parser.add_argument(
+            '--tolerance', type=float, default=0.2,
+            help='Допустимый относительный рост p95',
+        )
+
+    def handle(self, *args, **options):
+        results = benchmark.run(options['requests'], options['warmup'])
+        columns = ('status', 'p50_ms', 'p95_ms', 'p99_ms', 'queries',
+                   'memory_kb')
+        self.stdout.write(f'{"view":<18}' + ''.join(
+            f'{column:>11}' for column in columns))
+        for name, result in results.items():
+            self.stdout.write(f'{name:<18}' + ''.join(
+                f'{result[column]:>11}' for column in columns))
+        if options['save']:
+            benchmark.save(results, options['save'])
+        if options['baseline']:
+            regressions = benchmark.compare(
+                results, benchmark.load(options['baseline']),
+                options['tolerance'],
+            )
+            if regressions:
+                raise CommandError(
+                    'Регрессии относительно базового прогона:\n'
+                    + '\n'.join(regressions)
+                )
+            self.stdout.write(self.style.SUCCESS('Регрессий нет'))
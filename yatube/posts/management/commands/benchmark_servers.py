@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает пропускную способность страниц чтения через WSGI '
+            'и через ASGI-адаптер при одновременных клиентах')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=16)
+        parser.add_argument('--requests', type=int, default=400)
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Потоков обработчика в обоих режимах',
+        )
+
+    def handle(self, *args, **options):
+        results = benchmark.compare_servers(
+            options['clients'], options['requests'], options['workers'])
+        columns = ('rps', 'p50_ms', 'p95_ms', 'errors')
+        self.stdout.write(f'{"mode":<8}' + ''.join(
+            f'{column:>11}' for column in columns))
+        for mode, result in results.items():
+            self.stdout.write(f'{mode:<8}' + ''.join(
+                f'{result[column]:>11}' for column in columns))
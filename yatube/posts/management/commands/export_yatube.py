@@ -0,0 +1,36 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = ('Выгружает пользователей, группы, посты, комментарии '
+            'и подписки в NDJSON (.gz и .zst сжимаются)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл выгрузки или - для stdout')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def report(self, name, done):
+        self.stderr.write(f'{name}: {done}', ending='\r')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        try:
+            stream = (
+                sys.stdout if path == '-'
+                else transfer.open_stream(path, 'w')
+            )
+        except ValueError as error:
+            raise CommandError(error)
+        try:
+            counts = transfer.export(
+                stream, options['chunk_size'], self.report)
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
+        self.stderr.write('')
+        self.stderr.write(', '.join(
+            f'{name}: {count}' for name, count in counts.items()))
@@ -0,0 +1,38 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Заранее режет миниатюры для уже загруженных картинок постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.THUMBNAIL_WORKERS,
+            help='Число потоков генерации',
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Перегенерировать и готовые миниатюры',
+        )
+
+    def handle(self, *args, **options):
+        images = Post.objects.exclude(image='').values_list(
+            'image', flat=True).distinct().iterator()
+        scheduled = []
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            for name in images:
+                if not options['force'] and thumbnails.is_ready(name):
+                    continue
+                pool.submit(thumbnails.generate, name, force=options['force'])
+                scheduled.append(name)
+        # Воркеры только пишут файлы, в key-value хранилище
+        # миниатюры регистрируются из основного потока.
+        ready = sum(thumbnails.is_ready(name) for name in scheduled)
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано картинок: {len(scheduled)}, готово: {ready}'
+        ))
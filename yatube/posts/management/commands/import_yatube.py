@@ -0,0 +1,59 @@
+import os
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = ('Загружает выгрузку export_yatube пачками bulk_create; '
+            'прерванная загрузка продолжается с места остановки')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--state',
+            help='Файл SQLite с соответствием id и прогрессом '
+                 '(по умолчанию <path>.state.sqlite3)',
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Начать заново, забыв прогресс прошлой загрузки',
+        )
+        parser.add_argument(
+            '--skip-derived', action='store_true',
+            help='Не пересчитывать счётчики, ленты и поисковый индекс',
+        )
+
+    def report(self, name, done):
+        self.stdout.write(f'{name}: {done}', ending='\r')
+
+    def handle(self, *args, **options):
+        state = options['state'] or options['path'] + '.state.sqlite3'
+        if options['restart'] and os.path.exists(state):
+            os.remove(state)
+        try:
+            stream = transfer.open_stream(options['path'], 'r')
+        except (OSError, ValueError) as error:
+            raise CommandError(error)
+        importer = transfer.Importer(
+            state, options['batch_size'], self.report)
+        try:
+            with stream:
+                counts = importer.load(stream)
+        finally:
+            importer.close()
+        self.stdout.write('')
+        self.stdout.write(', '.join(
+            f'{name}: {count}' for name, count in counts.items()))
+        # bulk_create не шлёт сигналов: производные данные строятся
+        # заново, закешированные счётчики и фрагменты сбрасываются.
+        if not options['skip_derived']:
+            for command in ('recount', 'rebuild_timelines',
+                            'rebuild_search_index'):
+                call_command(command, stdout=self.stdout)
+        cache.clear()
+        self.stdout.write(self.style.SUCCESS('Готово'))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = 'Строит поисковый индекс постов и комментариев заново'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            indexed = search.rebuild()
+        backend = 'FTS5' if search.uses_fts() else 'SearchTerm'
+        self.stdout.write(self.style.SUCCESS(
+            f'Проиндексировано постов: {indexed} ({backend})'
+        ))
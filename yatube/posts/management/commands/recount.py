@@ -0,0 +1,34 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from posts import stats
+
+User = get_user_model()
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованные счётчики пользователей'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'usernames', nargs='*',
+            help='Пользователи для пересчёта (по умолчанию все)',
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('pk')
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+        total, last_pk = 0, 0
+        while True:
+            batch = users.filter(pk__gt=last_pk)[:BATCH_SIZE]
+            rows = stats.recount(batch)
+            if not rows:
+                break
+            total += len(rows)
+            last_pk = rows[-1].user_id
+        self.stdout.write(
+            self.style.SUCCESS(f'Пересчитано пользователей: {total}')
+        )
@@ -0,0 +1,45 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = ('Заполняет базу данными для бенчмарка: seed_yatube '
+            'с небольшими размерами по умолчанию')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--groups', type=int, default=5)
+        parser.add_argument('--posts', type=int, default=500)
+        parser.add_argument('--comments', type=int, default=1000)
+        parser.add_argument(
+            '--follows', type=int, default=10,
+            help='Среднее число подписок на пользователя',
+        )
+        parser.add_argument(
+            '--alpha', type=float, default=1.2,
+            help='Показатель степенного закона популярности авторов',
+        )
+        parser.add_argument(
+            '--images', type=float, default=0.1,
+            help='Доля постов с картинкой',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--prefix', default='bench',
+            help='Префикс имён пользователей и slug групп',
+        )
+
+    def handle(self, *args, **options):
+        call_command(
+            'seed_yatube',
+            users=options['users'],
+            groups=options['groups'],
+            posts=options['posts'],
+            comments=options['comments'],
+            follows=options['users'] * options['follows'],
+            alpha=options['alpha'],
+            images=options['images'],
+            seed=options['seed'],
+            prefix=options['prefix'],
+            stdout=self.stdout,
+        )
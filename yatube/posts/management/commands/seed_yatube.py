@@ -0,0 +1,90 @@
+import re
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.models import Group, User
+from posts.seeding import Seeder
+
+
+class Command(BaseCommand):
+    help = ('Генерирует большой синтетический набор пользователей, групп, '
+            'постов, комментариев и подписок через bulk_create')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--groups', type=int, default=100)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--comments', type=int, default=200000)
+        parser.add_argument('--follows', type=int, default=100000)
+        parser.add_argument(
+            '--alpha', type=float, default=1.1,
+            help='Показатель закона Ципфа для популярности авторов и постов',
+        )
+        parser.add_argument(
+            '--group-share', type=float, default=0.7,
+            help='Доля постов в группах',
+        )
+        parser.add_argument(
+            '--images', type=float, default=0.0,
+            help='Доля постов с картинкой из общего набора',
+        )
+        parser.add_argument(
+            '--image-corpus', type=int, default=20,
+            help='Сколько картинок сгенерировать для набора',
+        )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько дней разбросаны даты публикации',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--prefix', default='seed',
+            help='Префикс имён пользователей и slug групп',
+        )
+        parser.add_argument(
+            '--skip-derived', action='store_true',
+            help='Не пересчитывать счётчики, ленты и поисковый индекс',
+        )
+
+    def report(self, name, done, total, elapsed):
+        rate = done / elapsed if elapsed else 0
+        self.stdout.write(
+            f'{name}: {done}/{total} ({rate:.0f} строк/с)', ending='\r')
+        if done >= total:
+            self.stdout.write('')
+
+    def handle(self, *args, **options):
+        prefix = re.escape(options['prefix'])
+        if (User.objects.filter(username__regex=rf'^{prefix}\d+$').exists()
+                or Group.objects.filter(
+                    slug__regex=rf'^{prefix}-\d+$').exists()):
+            raise CommandError(
+                f'Префикс {options["prefix"]} уже занят: '
+                'укажите другой --prefix')
+        seeder = Seeder(
+            seed=options['seed'],
+            alpha=options['alpha'],
+            days=options['days'],
+            batch_size=options['batch_size'],
+            prefix=options['prefix'],
+            report=self.report,
+        )
+        seeder.users(options['users'])
+        seeder.groups(options['groups'])
+        if options['images']:
+            seeder.image_corpus(options['image_corpus'])
+        seeder.posts(
+            options['posts'], options['group_share'], options['images'])
+        seeder.comments(options['comments'])
+        seeder.follows(options['follows'])
+        # bulk_create не шлёт сигналов: производные данные строятся
+        # заново, закешированные счётчики и фрагменты сбрасываются.
+        if not options['skip_derived']:
+            for command in ('recount', 'rebuild_timelines',
+                            'rebuild_search_index'):
+                call_command(command, stdout=self.stdout)
+        cache.clear()
+        self.stdout.write(self.style.SUCCESS('Готово'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from posts import notifications
+from posts.constants import DIGEST_DELAY
+
+
+class Command(BaseCommand):
+    help = ('Собирает накопленные уведомления о новых постах в сводки '
+            'и рассылает их через EMAIL_BACKEND')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--delay', type=int, default=DIGEST_DELAY,
+            help='Сколько секунд должно ждать самое старое уведомление; '
+                 '0 — разослать всё сразу',
+        )
+
+    def handle(self, *args, **options):
+        sent = notifications.send_digests(options['delay'])
+        self.stdout.write(f'Отправлено писем: {sent}')
@@ -0,0 +1,63 @@
+# Generated by Django 2.2.16 on 2026-10-18 16:42
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+from posts.constants import (
+    FANOUT_FOLLOWERS_LIMIT, TIMELINE_BACKFILL, TIMELINE_BATCH_SIZE
+)
+
+
+def backfill_timelines(apps, schema_editor):
+    '''Заполняет ленты по существующим подпискам, как timeline.rebuild:
+    последние посты каждого автора, кроме популярных. Подписки читаются
+    пачками по id, записи пишутся пачками bulk_create.'''
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    TimelineEntry = apps.get_model('posts', 'TimelineEntry')
+    popular = Follow.objects.values('author').annotate(
+        followers=Count('user', distinct=True),
+    ).filter(followers__gte=FANOUT_FOLLOWERS_LIMIT).values('author')
+    follows = Follow.objects.exclude(author__in=popular).order_by('pk')
+    entries, last = [], 0
+    while True:
+        batch = list(follows.filter(pk__gt=last).values_list(
+            'pk', 'user_id', 'author_id')[:TIMELINE_BATCH_SIZE])
+        if not batch:
+            break
+        for last, user_id, author_id in batch:
+            posts = Post.objects.filter(author_id=author_id).order_by(
+                '-pub_date').values_list('pk', flat=True)[:TIMELINE_BACKFILL]
+            entries.extend(
+                TimelineEntry(user_id=user_id, post_id=pk) for pk in posts)
+            if len(entries) >= TIMELINE_BATCH_SIZE:
+                TimelineEntry.objects.bulk_create(
+                    entries, ignore_conflicts=True)
+                entries = []
+    TimelineEntry.objects.bulk_create(entries, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0009_auto_20230211_2201'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='posts.Post')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='timelineentry',
+            constraint=models.UniqueConstraint(fields=('user', 'post'), name='unique_timeline_entry'),
+        ),
+        migrations.RunPython(backfill_timelines, migrations.RunPython.noop),
+    ]
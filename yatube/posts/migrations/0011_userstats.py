@@ -0,0 +1,65 @@
+# Generated by Django 2.2.16 on 2026-10-18 16:49
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+BATCH_SIZE = 1000
+
+
+def backfill_stats(apps, schema_editor):
+    '''Создаёт строки счётчиков для существующих пользователей,
+    пачками по id: иначе первое чтение счётчиков пересчитывало бы их
+    в GET-запросе, а change() до этого ничего бы не сдвигал'''
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    UserStats = apps.get_model('posts', 'UserStats')
+    sources = {
+        'posts_count': (apps.get_model('posts', 'Post'), 'author'),
+        'comments_count': (apps.get_model('posts', 'Comment'), 'author'),
+        'followers_count': (apps.get_model('posts', 'Follow'), 'author'),
+        'following_count': (apps.get_model('posts', 'Follow'), 'user'),
+    }
+    counters = {
+        field: Coalesce(Subquery(model.objects.filter(
+            **{relation: OuterRef('pk')}
+        ).order_by().values(relation).annotate(
+            total=Count('pk')).values('total')), 0)
+        for field, (model, relation) in sources.items()
+    }
+    last = 0
+    while True:
+        users = list(User.objects.filter(pk__gt=last).order_by('pk').annotate(
+            **counters).values('pk', *counters)[:BATCH_SIZE])
+        if not users:
+            break
+        UserStats.objects.bulk_create([
+            UserStats(user_id=row['pk'], **{
+                field: row[field] for field in counters
+            })
+            for row in users
+        ], ignore_conflicts=True)
+        last = users[-1]['pk']
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0010_timelineentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('posts_count', models.IntegerField(default=0, verbose_name='Постов')),
+                ('comments_count', models.IntegerField(default=0, verbose_name='Комментариев')),
+                ('followers_count', models.IntegerField(default=0, verbose_name='Подписчиков')),
+                ('following_count', models.IntegerField(default=0, verbose_name='Подписок')),
+            ],
+        ),
+        migrations.RunPython(backfill_stats, migrations.RunPython.noop),
+    ]
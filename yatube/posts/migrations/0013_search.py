@@ -0,0 +1,56 @@
+# Generated by Django 2.2.16 on 2026-10-18 16:59
+
+from django.db import OperationalError, migrations, models
+
+# Если SQLite собран без FTS5, таблица не создаётся и поиск
+# работает по SearchTerm (см. posts/search.py).
+CREATE_FTS = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS posts_search USING fts5("
+    "text, comments, tokenize='unicode61 remove_diacritics 2')"
+)
+FILL_FTS = (
+    "INSERT INTO posts_search (rowid, text, comments) "
+    "SELECT p.id, p.text, COALESCE(("
+    "SELECT group_concat(c.text, ' ') FROM posts_comment c "
+    "WHERE c.post_id = p.id), '') FROM posts_post p"
+)
+
+
+def create_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        schema_editor.execute(CREATE_FTS)
+    except OperationalError:
+        return
+    schema_editor.execute(FILL_FTS)
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS posts_search')
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_follow_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, verbose_name='Слово')),
+                ('weight', models.PositiveIntegerField(default=0, verbose_name='Вес')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='posts.Post')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='searchterm',
+            constraint=models.UniqueConstraint(fields=('term', 'post'), name='unique_search_term'),
+        ),
+        migrations.RunPython(create_fts, drop_fts),
+    ]
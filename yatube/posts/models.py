@@ -75,3 +75,191 @@ class Follow(models.Model):
         on_delete=models.CASCADE,
         related_name="following",
     )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='unique_follow',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'],
+                name='follow_author_user_idx',
+            ),
+        ]
+
+
+class TimelineEntry(models.Model):
+    '''Запись в ленте подписок пользователя (fan-out on write)'''
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="timeline",
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name="timeline_entries",
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_timeline_entry',
+            ),
+        ]
+
+
+class UserStats(models.Model):
+    '''Денормализованные счётчики пользователя'''
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="stats",
+    )
+    posts_count = models.IntegerField('Постов', default=0)
+    comments_count = models.IntegerField('Комментариев', default=0)
+    followers_count = models.IntegerField('Подписчиков', default=0)
+    following_count = models.IntegerField('Подписок', default=0)
+
+    def __str__(self):
+        return f'Счётчики {self.user}'
+
+
+class SearchTerm(models.Model):
+    '''Строка инвертированного индекса поиска: слово и пост,
+    в тексте или комментариях которого оно встречается.
+    Используется, когда в базе нет FTS5.'''
+    term = models.CharField('Слово', max_length=64)
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name="search_terms",
+    )
+    weight = models.PositiveIntegerField('Вес', default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['term', 'post'],
+                name='unique_search_term',
+            ),
+        ]
+
+
+class Digest(models.Model):
+    '''Письмо-сводка: новые посты из подписок, накопленные
+    у пользователя за окно DIGEST_DELAY'''
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="digests",
+    )
+    created = models.DateTimeField('Собрана', auto_now_add=True)
+    sent = models.DateTimeField('Отправлена', null=True, blank=True)
+    emailed = models.BooleanField('Письмо отправлено', default=False)
+
+    def __str__(self):
+        return f'Сводка для {self.user}'
+
+
+class Notification(CreatedModel):
+    '''Уведомление подписчика о новом посте автора'''
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="notifications",
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name="notifications",
+    )
+    digest = models.ForeignKey(
+        Digest,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="notifications",
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_notification',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['digest', 'user', 'created'],
+                name='notification_pending_idx',
+            ),
+        ]
+
+
+class ArchivedPost(models.Model):
+    '''Старый пост, перенесённый из горячей таблицы командой
+    archive_posts. id сохраняется: адрес поста не меняется.'''
+    id = models.IntegerField(primary_key=True)
+    text = models.TextField()
+    pub_date = models.DateTimeField('Дата публикации')
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="archived_posts",
+    )
+    group = models.ForeignKey(
+        Group,
+        blank=True,
+        null=True,
+        on_delete=models.SET_NULL,
+        related_name='archived_posts',
+    )
+    image = models.ImageField('Картинка', upload_to='posts/', blank=True)
+    archived = models.DateTimeField('Перенесён в архив', auto_now_add=True)
+
+    class Meta:
+        ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=['author', 'pub_date'],
+                name='archived_post_author_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return self.text[:TEXT_POST]
+
+
+class ArchivedComment(models.Model):
+    '''Комментарий архивного поста'''
+    id = models.IntegerField(primary_key=True)
+    post = models.ForeignKey(
+        ArchivedPost,
+        on_delete=models.CASCADE,
+        related_name="comments",
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="archived_comments",
+    )
+    text = models.TextField()
+    created = models.DateTimeField('Дата создания')
+
+    class Meta:
+        ordering = ['created']
+        indexes = [
+            models.Index(
+                fields=['post', 'created'],
+                name='archived_comment_post_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return self.text[:TEXT_POST]
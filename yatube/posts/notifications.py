@@ -0,0 +1,131 @@
+from collections import defaultdict
+from datetime import timedelta
+from math import ceil
+
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Min, OuterRef, Subquery
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from core import jobs
+from .constants import (
+    DIGEST_BATCH_SIZE, DIGEST_DELAY, DIGEST_MAX_POSTS, NOTIFY_CHUNK_SIZE
+)
+from .models import Digest, Follow, Notification, Post
+
+DIGEST_SUBJECT = 'Новые посты в ваших подписках'
+
+
+def notify_followers(post_id, after=0):
+    '''Создаёт уведомления о посте для следующей порции подписчиков
+    (id больше after) и ставит задачу на порцию после неё. Так у автора
+    со ста тысячами подписчиков ни одна задача не пишет их всех сразу.'''
+    post = Post.objects.filter(pk=post_id).only('author').first()
+    if post is None:
+        return
+    followers = list(Follow.objects.filter(
+        author_id=post.author_id, user_id__gt=after,
+    ).order_by('user_id').values_list('user_id', flat=True)[
+        :NOTIFY_CHUNK_SIZE])
+    Notification.objects.bulk_create(
+        [Notification(user_id=user_id, post_id=post_id)
+         for user_id in followers],
+        ignore_conflicts=True,
+    )
+    if len(followers) == NOTIFY_CHUNK_SIZE:
+        jobs.enqueue(
+            'posts.notify', key=f'notify:{post_id}:{followers[-1]}',
+            post_id=post_id, after=followers[-1],
+        )
+    schedule_digests(DIGEST_DELAY)
+
+
+def schedule_digests(delay):
+    '''Ставит рассылку сводок через delay секунд; пока она ждёт
+    в очереди, новые посты другой не добавляют'''
+    jobs.enqueue('posts.send_digests', key='send_digests', delay=delay)
+
+
+def build_digests(user_ids, now):
+    '''Сводки пользователям: каждая забирает все их накопленные
+    уведомления. На пачку — вставка сводок, одно обновление
+    уведомлений и чтение сводок с пользователями.'''
+    Digest.objects.bulk_create(
+        [Digest(user_id=user_id) for user_id in user_ids])
+    open_digests = Digest.objects.filter(
+        user_id__in=user_ids, sent__isnull=True)
+    Notification.objects.filter(
+        user_id__in=user_ids, digest__isnull=True, created__lte=now,
+    ).update(digest=Subquery(open_digests.filter(
+        user=OuterRef('user')).order_by('-pk').values('pk')[:1]))
+    return list(open_digests.select_related('user'))
+
+
+def digest_message(digest, posts):
+    body = render_to_string('posts/email/digest.txt', {
+        'user': digest.user,
+        'posts': posts[:DIGEST_MAX_POSTS],
+        'more': max(len(posts) - DIGEST_MAX_POSTS, 0),
+    })
+    return EmailMessage(DIGEST_SUBJECT, body, to=[digest.user.email])
+
+
+def send_batch(digests, connection, now):
+    '''Отправляет пачку сводок одним соединением почтового бэкенда'''
+    posts = defaultdict(list)
+    notifications = Notification.objects.filter(
+        digest__in=digests,
+    ).select_related('post__author').order_by('post__pub_date', 'post_id')
+    for notification in notifications:
+        posts[notification.digest_id].append(notification.post)
+    emailed = [digest for digest in digests if digest.user.email]
+    connection.send_messages([
+        digest_message(digest, posts[digest.pk]) for digest in emailed
+    ])
+    Digest.objects.filter(pk__in=[digest.pk for digest in digests]).update(
+        sent=now)
+    Digest.objects.filter(pk__in=[digest.pk for digest in emailed]).update(
+        emailed=True)
+    return len(emailed)
+
+
+def resend(connection, now):
+    '''Досылает сводки, собранные запуском, который упал
+    на отправке: их уведомления уже не ждут новой сводки'''
+    unsent = Digest.objects.filter(
+        sent__isnull=True).select_related('user').order_by('pk')
+    sent, last = 0, 0
+    while True:
+        digests = list(unsent.filter(pk__gt=last)[:DIGEST_BATCH_SIZE])
+        if not digests:
+            return sent
+        sent += send_batch(digests, connection, now)
+        last = digests[-1].pk
+
+
+def send_digests(delay=DIGEST_DELAY):
+    '''Собирает и рассылает сводки тем, у кого самое старое
+    неразосланное уведомление ждёт дольше delay секунд: всплеск
+    постов уходит одним письмом. Сначала досылаются сводки,
+    не ушедшие в прошлый раз. Возвращает число писем.'''
+    now = timezone.now()
+    user_ids = list(Notification.objects.filter(
+        digest__isnull=True,
+    ).values('user').annotate(oldest=Min('created')).filter(
+        oldest__lte=now - timedelta(seconds=delay),
+    ).order_by('user').values_list('user', flat=True))
+    connection = get_connection()
+    with connection:
+        sent = resend(connection, now)
+        for start in range(0, len(user_ids), DIGEST_BATCH_SIZE):
+            digests = build_digests(
+                user_ids[start:start + DIGEST_BATCH_SIZE], now)
+            sent += send_batch(digests, connection, now)
+    # Уведомления, чьё окно ещё не истекло, разошлёт следующий запуск:
+    # без него они ждали бы, пока кто-нибудь снова напишет пост.
+    oldest = Notification.objects.filter(
+        digest__isnull=True).aggregate(oldest=Min('created'))['oldest']
+    if oldest is not None:
+        due = oldest + timedelta(seconds=DIGEST_DELAY) - timezone.now()
+        schedule_digests(max(ceil(due.total_seconds()), 1))
+    return sent
@@ -0,0 +1,75 @@
+import hashlib
+from functools import wraps
+
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from core import profiling
+from core.holes import fill
+from .constants import PAGE_CACHE_TIMEOUT
+from .stamps import GLOBAL_SCOPES, PAGE_PARAMS, get_stamps, per_request
+
+
+def page_key(request, scopes):
+    '''Ключ скелета страницы: путь, параметры страницы и версии
+    областей. Прочие параметры запроса страницу не меняют и в ключ
+    не входят. Пользователя в ключе нет — всё личное вынесено
+    в фрагменты.'''
+    page = [request.GET.get(param, '') for param in PAGE_PARAMS]
+    stamps = get_stamps(*scopes, *GLOBAL_SCOPES)
+    raw = '|'.join(map(str, [request.path, *page, *stamps]))
+    return 'posts:page:' + hashlib.md5(raw.encode()).hexdigest()
+
+
+def render_skeleton(view, request, *args, **kwargs):
+    '''Рендерит страницу с метками вместо персональных фрагментов'''
+    request.page_skeleton = True
+    try:
+        return view(request, *args, **kwargs)
+    finally:
+        request.page_skeleton = False
+
+
+def cached_page(get_scopes, get_holes=None):
+    '''Кеш страниц ленты.
+
+    Страница рендерится один раз как скелет: теги {% hole %} оставляют
+    в нём метки вместо шапки, кнопки подписки, формы комментария
+    и прочего, что зависит от пользователя. На каждый запрос метки
+    заполняются фрагментами для текущего пользователя с контекстом
+    get_holes(request, *args, **kwargs). Готовая страница для гостей
+    кешируется целиком, кроме запросов с панелью профилирования.
+    get_scopes — как у stamps.conditional.'''
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            scopes = None
+            if request.method in ('GET', 'HEAD'):
+                scopes = per_request(get_scopes, request, *args, **kwargs)
+            if scopes is None:
+                return view(request, *args, **kwargs)
+            key = page_key(request, scopes)
+            # Панель профилирования — своя у каждого запроса.
+            anonymous = (
+                not request.user.is_authenticated and not profiling.shown())
+            if anonymous:
+                content = cache.get(key + ':anonymous')
+                if content is not None:
+                    return HttpResponse(content)
+            skeleton = cache.get(key)
+            if skeleton is None:
+                response = render_skeleton(view, request, *args, **kwargs)
+                if response.status_code != 200 or response.streaming:
+                    return response
+                skeleton = response.content.decode(response.charset)
+                cache.set(key, skeleton, PAGE_CACHE_TIMEOUT)
+            else:
+                response = HttpResponse()
+            holes = get_holes(request, *args, **kwargs) if get_holes else {}
+            response.content = fill(skeleton, request, holes)
+            if anonymous:
+                cache.set(
+                    key + ':anonymous', response.content, PAGE_CACHE_TIMEOUT)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,180 @@
+import re
+from collections import Counter
+
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+
+from .constants import (
+    SEARCH_COMMENT_WEIGHT, SEARCH_MAX_TERMS, SEARCH_TERM_LENGTH,
+    SEARCH_TEXT_WEIGHT
+)
+from .feeds import feed_queryset
+from .models import Comment, Post, SearchTerm
+
+# Таблица FTS5 создаётся миграцией 0013_search только на SQLite.
+FTS_TABLE = 'posts_search'
+WORD_RE = re.compile(r'\w+')
+
+_fts = {}
+
+
+def tokenize(text):
+    '''Слова текста в нижнем регистре'''
+    return [
+        word[:SEARCH_TERM_LENGTH] for word in WORD_RE.findall(text.lower())
+    ]
+
+
+def uses_fts():
+    '''Есть ли в базе индекс FTS5; иначе поиск идёт по SearchTerm'''
+    if connection.alias not in _fts:
+        _fts[connection.alias] = (
+            connection.vendor == 'sqlite'
+            and FTS_TABLE in connection.introspection.table_names()
+        )
+    return _fts[connection.alias]
+
+
+def _comments_text(post_id):
+    return ' '.join(
+        Comment.objects.filter(post_id=post_id).values_list('text', flat=True)
+    )
+
+
+def _term_weights(text, comments):
+    weights = Counter()
+    for word in tokenize(text):
+        weights[word] += SEARCH_TEXT_WEIGHT
+    for word in tokenize(comments):
+        weights[word] += SEARCH_COMMENT_WEIGHT
+    return weights
+
+
+def index_post(post_id, text=None):
+    '''Переиндексирует пост вместе с его комментариями'''
+    if text is None:
+        text = Post.objects.filter(
+            pk=post_id
+        ).values_list('text', flat=True).first()
+        if text is None:
+            return
+    comments = _comments_text(post_id)
+    if uses_fts():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id])
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text, comments) '
+                'VALUES (%s, %s, %s)',
+                [post_id, text, comments],
+            )
+        return
+    with transaction.atomic():
+        SearchTerm.objects.filter(post_id=post_id).delete()
+        SearchTerm.objects.bulk_create(
+            SearchTerm(term=term, post_id=post_id, weight=weight)
+            for term, weight in _term_weights(text, comments).items()
+        )
+
+
+def remove_post(post_id):
+    '''Убирает пост из индекса FTS5; строки SearchTerm
+    удаляются каскадом вместе с постом'''
+    if uses_fts():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id])
+
+
+def rebuild():
+    '''Строит индекс заново по всем постам'''
+    if uses_fts():
+        # Одним INSERT ... SELECT: на миллионах постов это минуты,
+        # а не часы по запросу комментариев на каждый пост.
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text, comments) '
+                'SELECT p.id, p.text, COALESCE(('
+                "SELECT group_concat(c.text, ' ') FROM posts_comment c "
+                "WHERE c.post_id = p.id), '') FROM posts_post p"
+            )
+            return cursor.rowcount
+    SearchTerm.objects.all().delete()
+    posts = Post.objects.values_list('pk', 'text').iterator()
+    indexed = 0
+    for pk, text in posts:
+        index_post(pk, text)
+        indexed += 1
+    return indexed
+
+
+class SearchResults:
+    '''Посты по запросу в порядке релевантности.
+
+    Ленивый список для Paginator: count() — один запрос,
+    срез — один запрос за id страницы и один за сами посты.
+    Пост находится, если в нём или в его комментариях
+    встречаются все слова запроса.'''
+
+    def __init__(self, query):
+        self.terms = list(dict.fromkeys(tokenize(query)))[:SEARCH_MAX_TERMS]
+
+    def _match(self):
+        return ' '.join(f'"{term}"' for term in self.terms)
+
+    def _fts_sql(self, select):
+        return (
+            f'SELECT {select} FROM {FTS_TABLE} '
+            f'JOIN posts_post ON posts_post.id = {FTS_TABLE}.rowid '
+            f'WHERE {FTS_TABLE} MATCH %s'
+        )
+
+    def _matched_terms(self):
+        return SearchTerm.objects.filter(
+            term__in=self.terms
+        ).values('post').annotate(
+            matched=Count('term'), score=Sum('weight')
+        ).filter(matched=len(self.terms))
+
+    def count(self):
+        if not self.terms:
+            return 0
+        if not uses_fts():
+            return self._matched_terms().count()
+        with connection.cursor() as cursor:
+            cursor.execute(self._fts_sql('COUNT(*)'), [self._match()])
+            return cursor.fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def ranked_ids(self, offset=0, limit=None):
+        '''id найденных постов, от самых релевантных'''
+        if not self.terms:
+            return []
+        if not uses_fts():
+            ranked = self._matched_terms().order_by(
+                '-score', '-post'
+            ).values_list('post', flat=True)
+            stop = None if limit is None else offset + limit
+            return list(ranked[offset:stop])
+        sql = self._fts_sql(f'{FTS_TABLE}.rowid') + (
+            f' ORDER BY bm25({FTS_TABLE}, {SEARCH_TEXT_WEIGHT}, '
+            f'{SEARCH_COMMENT_WEIGHT}), {FTS_TABLE}.rowid DESC '
+            'LIMIT %s OFFSET %s'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [
+                self._match(), -1 if limit is None else limit, offset
+            ])
+            return [row[0] for row in cursor.fetchall()]
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            raise TypeError('SearchResults поддерживает только срезы')
+        start = key.start or 0
+        limit = None if key.stop is None else key.stop - start
+        ids = self.ranked_ids(start, limit)
+        posts = feed_queryset('search').in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
@@ -0,0 +1,232 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from io import BytesIO
+from math import gcd
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from faker import Faker
+from PIL import Image
+
+from .models import Comment, Follow, Group, Post, User
+
+# Словарь и имена генерируются Faker один раз, дальше тексты
+# собираются из них: Faker на каждую строку слишком медленный.
+VOCABULARY_SIZE = 5000
+NAMES_SIZE = 500
+SEED_PASSWORD = 'seed-password'
+
+
+@contextmanager
+def explicit_dates():
+    '''Даёт bulk_create записать свои pub_date/created
+    вместо auto_now_add'''
+    fields = [
+        Post._meta.get_field('pub_date'),
+        Comment._meta.get_field('created'),
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Popularity:
+    '''Выбор id по закону Ципфа с показателем alpha без списка весов.
+
+    Ранг берётся обратной функцией непрерывного распределения
+    x ** -alpha на [1, n + 1), а ранг переводится в id случайной
+    перестановкой (step * rank + shift) mod n. Память не зависит
+    от числа id: ids может быть диапазоном range.'''
+
+    def __init__(self, ids, alpha, rng):
+        self.ids, self.alpha, self.rng = ids, alpha, rng
+        self.n = len(ids)
+        self.step = 1
+        if self.n > 1:
+            self.step = rng.randrange(1, self.n)
+            while gcd(self.step, self.n) != 1:
+                self.step = rng.randrange(1, self.n)
+        self.shift = rng.randrange(self.n) if self.n else 0
+
+    def rank(self):
+        '''Ранг от 0: чем меньше, тем вероятнее'''
+        u, top = self.rng.random(), self.n + 1
+        if self.alpha == 1:
+            x = top ** u
+        else:
+            power = 1 - self.alpha
+            x = (1 + u * (top ** power - 1)) ** (1 / power)
+        return min(int(x), self.n) - 1
+
+    def pick(self):
+        return self.ids[(self.step * self.rank() + self.shift) % self.n]
+
+
+class Seeder:
+    '''Потоковый генератор синтетических данных.
+
+    Строки создаются генераторами и вставляются bulk_create пачками
+    по batch_size, а от вставленных строк хранятся только диапазоны
+    их id, так что память не растёт с размером набора. Популярность
+    пользователей и постов распределена по закону Ципфа с показателем
+    alpha (Popularity); при одном seed данные одинаковы.'''
+
+    def __init__(self, seed=0, alpha=1.1, days=365, batch_size=5000,
+                 prefix='seed', report=None):
+        self.rng = random.Random(seed)
+        fake = Faker('ru_RU')
+        fake.seed_instance(seed)
+        self.words = [fake.word() for _ in range(VOCABULARY_SIZE)]
+        self.first_names = [fake.first_name() for _ in range(NAMES_SIZE)]
+        self.last_names = [fake.last_name() for _ in range(NAMES_SIZE)]
+        self.alpha = alpha
+        self.span = days * 24 * 60 * 60
+        self.now = timezone.now()
+        self.batch_size = batch_size
+        self.prefix = prefix
+        self.report = report or (lambda *args: None)
+        self.user_ids = self.group_ids = self.post_ids = []
+        self.images = []
+
+    def popular(self, ids):
+        return Popularity(ids, self.alpha, self.rng)
+
+    def text(self, low, high):
+        words = self.rng.choices(self.words, k=self.rng.randint(low, high))
+        return ' '.join(words).capitalize() + '.'
+
+    def date(self):
+        return self.now - timedelta(seconds=self.rng.random() * self.span)
+
+    def insert(self, model, rows, total, **kwargs):
+        '''Вставляет поток объектов пачками, сообщая о прогрессе'''
+        name = model.__name__
+        started, done, batch = time.monotonic(), 0, []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == self.batch_size:
+                model.objects.bulk_create(batch, **kwargs)
+                done += len(batch)
+                batch = []
+                self.report(name, done, total, time.monotonic() - started)
+        if batch:
+            model.objects.bulk_create(batch, **kwargs)
+            done += len(batch)
+            self.report(name, done, total, time.monotonic() - started)
+        return done
+
+    def _new_ids(self, model, after):
+        '''Id вставленных строк. Без параллельных писателей они идут
+        подряд после прежнего максимума, и хранится только диапазон;
+        иначе id читаются списком.'''
+        ids = range(after + 1, self._last_pk(model) + 1)
+        if model.objects.filter(pk__gt=after).count() == len(ids):
+            return ids
+        return list(
+            model.objects.filter(pk__gt=after).order_by('pk')
+            .values_list('pk', flat=True)
+        )
+
+    def _last_pk(self, model):
+        return model.objects.order_by('-pk').values_list(
+            'pk', flat=True).first() or 0
+
+    def users(self, count):
+        after = self._last_pk(User)
+        password = make_password(SEED_PASSWORD)
+        self.insert(User, (
+            User(
+                username=f'{self.prefix}{number}',
+                first_name=self.rng.choice(self.first_names),
+                last_name=self.rng.choice(self.last_names),
+                password=password,
+            )
+            for number in range(count)
+        ), count)
+        self.user_ids = self._new_ids(User, after)
+
+    def groups(self, count):
+        after = self._last_pk(Group)
+        self.insert(Group, (
+            Group(
+                title=self.text(1, 4)[:200],
+                slug=f'{self.prefix}-{number}',
+                description=self.text(10, 40),
+            )
+            for number in range(count)
+        ), count)
+        self.group_ids = self._new_ids(Group, after)
+
+    def image_corpus(self, count):
+        '''Небольшой набор картинок, общий для всех постов'''
+        self.images = []
+        for number in range(count):
+            buffer = BytesIO()
+            color = tuple(self.rng.randrange(256) for _ in range(3))
+            Image.new('RGB', (960, 540), color).save(buffer, 'JPEG')
+            self.images.append(default_storage.save(
+                f'posts/{self.prefix}-{number}.jpg',
+                ContentFile(buffer.getvalue()),
+            ))
+
+    def posts(self, count, group_share=0.7, image_share=0.0):
+        after = self._last_pk(Post)
+        authors = self.popular(self.user_ids)
+
+        def rows():
+            for _ in range(count):
+                group = None
+                if self.group_ids and self.rng.random() < group_share:
+                    group = self.rng.choice(self.group_ids)
+                image = ''
+                if self.images and self.rng.random() < image_share:
+                    image = self.rng.choice(self.images)
+                yield Post(
+                    author_id=authors.pick(),
+                    group_id=group,
+                    text=self.text(5, 80),
+                    pub_date=self.date(),
+                    image=image,
+                )
+
+        with explicit_dates():
+            self.insert(Post, rows(), count)
+        self.post_ids = self._new_ids(Post, after)
+
+    def comments(self, count):
+        if not self.post_ids:
+            return 0
+        posts = self.popular(self.post_ids)
+        authors = self.popular(self.user_ids)
+        with explicit_dates():
+            return self.insert(Comment, (
+                Comment(
+                    post_id=posts.pick(),
+                    author_id=authors.pick(),
+                    text=self.text(2, 30),
+                    created=self.date(),
+                )
+                for _ in range(count)
+            ), count)
+
+    def follows(self, count):
+        '''Подписчики выбираются равномерно, авторы — по Ципфу;
+        повторы и подписки на себя отбрасываются'''
+        authors = self.popular(self.user_ids)
+
+        def rows():
+            for _ in range(count):
+                user = self.rng.choice(self.user_ids)
+                author = authors.pick()
+                if user != author:
+                    yield Follow(user_id=user, author_id=author)
+
+        return self.insert(Follow, rows(), count, ignore_conflicts=True)
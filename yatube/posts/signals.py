@@ -0,0 +1,142 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.signals import request_finished
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core import jobs
+from . import (
+    archive, counts, follows, search, stamps, stats, thumbnails, timeline
+)
+from . import tasks  # noqa: F401
+from .models import Comment, Follow, Group, Post
+from .utils import group_cache_key, user_id_key
+
+User = get_user_model()
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, **kwargs):
+    instance._old_group_id = instance._old_image = instance._old_text = None
+    if instance.pk:
+        (
+            instance._old_group_id, instance._old_image, instance._old_text
+        ) = Post.objects.filter(pk=instance.pk).values_list(
+            'group_id', 'image', 'text'
+        ).first() or (None, None, None)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    scopes = stamps.post_scopes(instance)
+    if instance._old_group_id:
+        scopes.append(f'group:{instance._old_group_id}')
+    stamps.bump(*scopes)
+    if instance.image and instance.image.name != instance._old_image:
+        transaction.on_commit(
+            lambda: thumbnails.schedule(instance.image.name, scopes)
+        )
+    if instance.text != instance._old_text:
+        tasks.enqueue_index(instance.pk)
+    if created:
+        counts.adjust(counts.post_scopes(instance), 1)
+        stats.change(instance.author_id, posts_count=1)
+        jobs.enqueue(
+            'posts.fan_out', key=f'fan_out:{instance.pk}',
+            post_id=instance.pk,
+        )
+        jobs.enqueue(
+            'posts.notify', key=f'notify:{instance.pk}:0',
+            post_id=instance.pk,
+        )
+    elif instance._old_group_id != instance.group_id:
+        if instance._old_group_id:
+            counts.adjust([f'group:{instance._old_group_id}'], -1)
+        if instance.group_id:
+            counts.adjust([f'group:{instance.group_id}'], 1)
+
+
+@receiver(request_finished)
+def request_done(sender, **kwargs):
+    thumbnails.wait_scheduled()
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counts.adjust(counts.post_scopes(instance), -1)
+    if not archive.in_progress():
+        stats.change(instance.author_id, posts_count=-1)
+    stamps.bump(*stamps.post_scopes(instance))
+    # Архив в поиск не входит: переезжающий пост тоже удаляется из индекса.
+    search.remove_post(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        stats.change(instance.author_id, comments_count=1)
+    stamps.bump(f'post:{instance.post_id}')
+    tasks.enqueue_index(instance.post_id)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    if archive.in_progress():
+        return
+    stats.change(instance.author_id, comments_count=-1)
+    stamps.bump(f'post:{instance.post_id}')
+    tasks.enqueue_index(instance.post_id)
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, **kwargs):
+    if created:
+        follows.invalidate(instance)
+        stamps.bump(*stamps.follow_scopes(instance))
+        stats.change(instance.author_id, followers_count=1)
+        stats.change(instance.user_id, following_count=1)
+        timeline.backfill(instance.user, instance.author)
+        timeline.followers_changed(instance.author_id, 1)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    follows.invalidate(instance)
+    stamps.bump(*stamps.follow_scopes(instance))
+    stats.change(instance.author_id, followers_count=-1)
+    stats.change(instance.user_id, following_count=-1)
+    timeline.trim(instance.user, instance.author)
+    timeline.followers_changed(instance.author_id, -1)
+
+
+@receiver(pre_save, sender=Group)
+def group_saving(sender, instance, **kwargs):
+    if instance.pk:
+        old_slug = Group.objects.filter(
+            pk=instance.pk
+        ).values_list('slug', flat=True).first()
+        if old_slug:
+            cache.delete(group_cache_key(old_slug))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    cache.delete(group_cache_key(instance.slug))
+    stamps.bump('groups')
+
+
+@receiver(post_save, sender=User)
+def user_created(sender, instance, created, **kwargs):
+    if created:
+        stats.create(instance.pk)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) == {'last_login'}:
+        return
+    cache.delete(user_id_key(instance.username))
+    stamps.bump('users')
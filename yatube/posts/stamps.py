@@ -0,0 +1,109 @@
+import hashlib
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.views.decorators.http import condition
+
+from .counts import post_scopes as post_count_scopes
+
+# Области, от которых зависит любая лента: названия и slug групп,
+# имена авторов.
+GLOBAL_SCOPES = ('groups', 'users')
+PAGE_PARAMS = ('page', 'after', 'before')
+
+
+def stamp_key(scope):
+    return f'posts:stamp:{scope}'
+
+
+def new_stamp():
+    return time.time_ns()
+
+
+def post_scopes(post):
+    '''Области, содержимое которых зависит от поста'''
+    return post_count_scopes(post) + [f'post:{post.pk}']
+
+
+def follow_scopes(follow):
+    '''Подписка меняет счётчики обоих и кнопку на странице автора'''
+    return [f'follows:{follow.user_id}', f'follows:{follow.author_id}']
+
+
+def bump(*scopes):
+    '''Сдвигает версии областей: всё, что от них зависит, устаревает'''
+    stamp = new_stamp()
+    cache.set_many({stamp_key(scope): stamp for scope in scopes}, None)
+
+
+def get_stamps(*scopes):
+    '''Текущие версии областей; отсутствующие в кеше создаются заново'''
+    keys = [stamp_key(scope) for scope in scopes]
+    stamps = cache.get_many(keys)
+    missing = {key: new_stamp() for key in keys if key not in stamps}
+    if missing:
+        cache.set_many(missing, None)
+        stamps.update(missing)
+    return [stamps[key] for key in keys]
+
+
+def fragment_key(request, kind, *scopes):
+    '''Ключ фрагмента ленты: тип ленты, страница или курсор
+    и версии всех областей, от которых зависит её содержимое'''
+    page = [request.GET.get(param, '') for param in PAGE_PARAMS]
+    stamps = get_stamps(*scopes, *GLOBAL_SCOPES)
+    raw = '|'.join(map(str, page + stamps))
+    return f'{kind}:' + hashlib.md5(raw.encode()).hexdigest()
+
+
+def request_etag(request, *scopes):
+    '''ETag страницы: версии областей, параметры запроса и пользователь,
+    для которого она отрисована. Для вошедших учитывается и cookie
+    CSRF: после нового входа токен в форме комментария другой,
+    и страница с прежним токеном не должна отдаваться как 304.'''
+    user = csrf = ''
+    if request.user.is_authenticated:
+        user = request.user.pk
+        csrf = request.COOKIES.get(settings.CSRF_COOKIE_NAME, '')
+    stamps = get_stamps(*scopes, *GLOBAL_SCOPES)
+    raw = '|'.join(map(str, [user, csrf, request.GET.urlencode(), *stamps]))
+    return '"' + hashlib.md5(raw.encode()).hexdigest() + '"'
+
+
+def last_modified(request, *scopes):
+    '''Время последнего изменения областей. Для вошедших пользователей
+    не отдаётся: страница зависит ещё и от них, это учитывает только ETag'''
+    if request.user.is_authenticated:
+        return None
+    stamp = max(get_stamps(*scopes, *GLOBAL_SCOPES))
+    return datetime.fromtimestamp(stamp / 10 ** 9, tz=timezone.utc)
+
+
+def per_request(func, request, *args, **kwargs):
+    '''Результат func(request, *args, **kwargs), посчитанный один раз
+    за запрос: области нужны и условному GET, и кешу страниц'''
+    memo = request.__dict__.setdefault('_per_request', {})
+    key = (func, args, tuple(sorted(kwargs.items())))
+    if key not in memo:
+        memo[key] = func(request, *args, **kwargs)
+    return memo[key]
+
+
+def conditional(get_scopes):
+    '''Условный GET (304) по версиям областей без запросов к постам.
+    get_scopes(request, *args, **kwargs) возвращает области страницы
+    или None, если их не определить — тогда вью выполняется как обычно.'''
+    def etag_func(request, *args, **kwargs):
+        scopes = per_request(get_scopes, request, *args, **kwargs)
+        return None if scopes is None else request_etag(request, *scopes)
+
+    def last_modified_func(request, *args, **kwargs):
+        scopes = per_request(get_scopes, request, *args, **kwargs)
+        return None if scopes is None else last_modified(request, *scopes)
+
+    def decorator(view):
+        return wraps(view)(condition(etag_func, last_modified_func)(view))
+    return decorator
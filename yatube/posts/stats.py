@@ -0,0 +1,82 @@
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import (
+    ArchivedComment, ArchivedPost, Comment, Follow, Post, User, UserStats
+)
+
+# Счётчик -> (модель, поле пользователя) для каждой таблицы, где лежат
+# его строки: архивные посты и комментарии по-прежнему считаются.
+STATS_FIELDS = {
+    'posts_count': ((Post, 'author'), (ArchivedPost, 'author')),
+    'comments_count': ((Comment, 'author'), (ArchivedComment, 'author')),
+    'followers_count': ((Follow, 'author'),),
+    'following_count': ((Follow, 'user'),),
+}
+
+
+def change(user_id, **deltas):
+    '''Атомарно сдвигает счётчики пользователя F-выражениями.
+    Если строки счётчиков ещё нет, она будет пересчитана при чтении.'''
+    UserStats.objects.filter(user_id=user_id).update(**{
+        field: F(field) + delta for field, delta in deltas.items()
+    })
+
+
+def _counted(model, field):
+    counted = model.objects.filter(
+        **{field: OuterRef('pk')}
+    ).order_by().values(field).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(counted), 0)
+
+
+def _total(sources):
+    '''Сумма подзапросов-счётчиков по всем таблицам источника'''
+    return sum(
+        (_counted(model, field) for model, field in sources[1:]),
+        _counted(*sources[0]),
+    )
+
+
+def counted(users):
+    '''Строки счётчиков для выборки пользователей, посчитанные с нуля'''
+    users = users.annotate(**{
+        field: _total(sources) for field, sources in STATS_FIELDS.items()
+    })
+    return [
+        UserStats(user_id=user.pk, **{
+            field: getattr(user, field) for field in STATS_FIELDS
+        })
+        for user in users
+    ]
+
+
+def recount(users):
+    '''Пересчитывает счётчики для выборки пользователей с нуля'''
+    rows = counted(users)
+    with transaction.atomic():
+        UserStats.objects.filter(
+            user_id__in=[row.user_id for row in rows]
+        ).delete()
+        UserStats.objects.bulk_create(rows)
+    return rows
+
+
+def create(user_id):
+    '''Нулевые счётчики нового пользователя: change() сдвигает
+    только существующую строку'''
+    UserStats.objects.bulk_create(
+        [UserStats(user_id=user_id)], ignore_conflicts=True)
+
+
+def get_stats(user):
+    '''Счётчики пользователя. Строки создаются миграцией и при
+    регистрации; если её всё же нет, она досчитывается и вставляется
+    без удаления, так что параллельные первые чтения не конфликтуют.'''
+    stats = UserStats.objects.filter(user=user).first()
+    if stats is None:
+        UserStats.objects.bulk_create(
+            counted(User.objects.filter(pk=user.pk)), ignore_conflicts=True)
+        stats = UserStats.objects.get(user=user)
+    return stats
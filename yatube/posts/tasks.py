@@ -0,0 +1,44 @@
+from core import jobs
+from . import notifications, search, thumbnails, timeline
+from .models import Post
+
+
+@jobs.task('posts.fan_out')
+def fan_out(post_id):
+    '''Раскладывает пост по лентам подписчиков'''
+    post = Post.objects.select_related('author').filter(pk=post_id).first()
+    if post is not None:
+        timeline.fan_out(post)
+
+
+@jobs.task('posts.reconcile_timelines')
+def reconcile_timelines(author_id):
+    '''Перестраивает ленты после смены популярности автора'''
+    timeline.reconcile(author_id)
+
+
+@jobs.task('posts.index_post')
+def index_post(post_id):
+    '''Переиндексирует пост с комментариями; удалённый пропускается'''
+    search.index_post(post_id)
+
+
+@jobs.task('posts.thumbnails')
+def make_thumbnails(name, scopes):
+    thumbnails.create(name, scopes)
+
+
+@jobs.task('posts.notify')
+def notify(post_id, after=0):
+    notifications.notify_followers(post_id, after)
+
+
+@jobs.task('posts.send_digests')
+def send_digests():
+    notifications.send_digests()
+
+
+def enqueue_index(post_id):
+    '''Пока переиндексация поста ждёт в очереди, новые правки
+    и комментарии к нему отдельной задачи не добавляют'''
+    jobs.enqueue('posts.index_post', key=f'search:{post_id}', post_id=post_id)
@@ -0,0 +1,87 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(
+            username='author', first_name='Лев', last_name='Толстой')
+        cls.reader = User.objects.create(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        for number in range(5):
+            Post.objects.create(
+                author=cls.author, text=f'Пост {number}', group=cls.group)
+        Post.objects.create(author=cls.reader, text='Пост читателя')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def get(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        return json.loads(b''.join(response.streaming_content))
+
+    def test_cursor_pages(self):
+        '''Лента листается курсором ?after= без пропусков и повторов'''
+        url = reverse('posts:api_posts')
+        first = self.get(url, limit=4)
+        second = self.get(url, limit=4, after=first['next'])
+        texts = [post['text'] for post in first['results']]
+        texts += [post['text'] for post in second['results']]
+        self.assertEqual(texts, list(
+            Post.objects.order_by('-pub_date', '-pk').values_list(
+                'text', flat=True)))
+        self.assertIsNone(second['next'])
+
+    def test_post_fields(self):
+        '''Автор и группа отдаются вложенными объектами'''
+        data = self.get(
+            reverse('posts:api_group_posts', args=[self.group.slug]), limit=1)
+        post = data['results'][0]
+        self.assertEqual(post['author'], {
+            'username': 'author', 'full_name': 'Лев Толстой'})
+        self.assertEqual(post['group'], {'slug': 'group', 'title': 'Группа'})
+        self.assertEqual(post['url'], reverse(
+            'posts:post_detail', args=[post['id']]))
+
+    def test_related_fetched_in_batches(self):
+        '''Авторы и группы читаются одним запросом на страницу'''
+        response = self.client.get(reverse('posts:api_posts'))
+        with self.assertNumQueries(3):
+            data = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(len(data['results']), 6)
+
+    def test_user_posts_and_feed(self):
+        '''Посты автора и лента подписок; лента только для вошедших'''
+        data = self.get(reverse('posts:api_user_posts', args=['reader']))
+        self.assertEqual(
+            [post['text'] for post in data['results']], ['Пост читателя'])
+        response = self.client.get(reverse('posts:api_feed'))
+        self.assertEqual(response.status_code, 401)
+        self.client.force_login(self.reader)
+        data = self.get(reverse('posts:api_feed'))
+        self.assertEqual(len(data['results']), 5)
+
+    def test_not_found(self):
+        '''Несуществующие группа и автор дают JSON с 404'''
+        for url in (
+            reverse('posts:api_group_posts', args=['nope']),
+            reverse('posts:api_user_posts', args=['nope']),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 404)
+                self.assertIn('detail', response.json())
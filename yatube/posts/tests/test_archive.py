@@ -0,0 +1,95 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.constants import PER_PAGE
+from posts.models import ArchivedComment, ArchivedPost, Comment, Post
+from posts.stats import get_stats
+
+User = get_user_model()
+
+
+class ArchiveTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        now = timezone.now()
+        cls.posts = []
+        for number in range(PER_PAGE + 5):
+            post = Post.objects.create(
+                author=cls.author, text=f'Пост {number}')
+            Post.objects.filter(pk=post.pk).update(
+                pub_date=now - timedelta(days=number * 30))
+            cls.posts.append(post)
+        cls.old = cls.posts[-1]
+        Comment.objects.create(
+            post=cls.old, author=cls.author, text='Старый комментарий')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def archive(self):
+        call_command('archive_posts', older_than_days=200, batch_size=2,
+                     stdout=StringIO())
+
+    def test_moves_old_posts(self):
+        '''Старые посты и их комментарии переезжают в архив,
+        счётчики автора не меняются'''
+        self.archive()
+        archived = ArchivedPost.objects.count()
+        self.assertEqual(archived, PER_PAGE + 5 - 7)
+        self.assertEqual(Post.objects.count(), 7)
+        self.assertTrue(ArchivedComment.objects.filter(
+            post_id=self.old.pk, text='Старый комментарий').exists())
+        cache.clear()
+        stats = get_stats(self.author)
+        self.assertEqual(
+            (stats.posts_count, stats.comments_count), (PER_PAGE + 5, 1))
+
+    def test_post_detail_reads_archive(self):
+        '''Архивный пост открывается по прежнему адресу, без формы'''
+        self.client.force_login(self.author)
+        self.archive()
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.old.pk]))
+        self.assertContains(response, self.old.text)
+        self.assertContains(response, 'Старый комментарий')
+        self.assertNotContains(response, 'Добавить комментарий')
+        self.assertNotContains(response, 'Редактировать запись')
+
+    def test_profile_continues_into_archive(self):
+        '''Лента профиля после горячих постов продолжается архивом'''
+        self.archive()
+        url = reverse('posts:profile', args=[self.author.username])
+        first = self.client.get(url).context['page_obj']
+        second = self.client.get(
+            url, {'after': first.next_cursor}).context['page_obj']
+        self.assertEqual(
+            [post.pk for post in list(first) + list(second)],
+            [post.pk for post in self.posts])
+        last = self.client.get(url, {'page': 2}).context['page_obj']
+        self.assertEqual(
+            [post.pk for post in last], [post.pk for post in second])
+
+    def test_recount_includes_archive(self):
+        '''Пересчёт счётчиков после архивации учитывает архив,
+        и номер страницы по-прежнему ведёт в архивную часть ленты'''
+        self.archive()
+        call_command('recount', stdout=StringIO())
+        stats = get_stats(self.author)
+        self.assertEqual(
+            (stats.posts_count, stats.comments_count), (PER_PAGE + 5, 1))
+        cache.clear()
+        url = reverse('posts:profile', args=[self.author.username])
+        last = self.client.get(url, {'page': 2}).context['page_obj']
+        self.assertEqual(
+            [post.pk for post in last],
+            [post.pk for post in self.posts[PER_PAGE:]])
@@ -0,0 +1,88 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from posts import benchmark
+from posts.models import Follow, Group, Post, User, UserStats
+
+
+class BenchmarkTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def snapshot(self):
+        return (
+            list(Post.objects.order_by('pk').values_list(
+                'text', 'author__username', 'group__slug')),
+            set(Follow.objects.values_list(
+                'user__username', 'author__username')),
+        )
+
+    def test_seed_is_reproducible(self):
+        '''Один seed — одинаковые данные, счётчики пересчитаны'''
+        options = dict(
+            users=6, groups=2, posts=20, comments=10, follows=2, images=0,
+            seed=7, stdout=StringIO(),
+        )
+        call_command('seed_benchmark', **options)
+        first = self.snapshot()
+        self.assertEqual(UserStats.objects.count(), 6)
+        self.assertEqual(len(first[0]), 20)
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        call_command('seed_benchmark', **options)
+        self.assertEqual(self.snapshot(), first)
+
+    def test_seed_into_non_empty_base(self):
+        '''Повторное заполнение с другим префиксом дополняет базу,
+        а с занятым — сообщает об этом, а не падает на дублях'''
+        options = dict(
+            users=3, groups=2, posts=4, comments=2, follows=1, images=0,
+            stdout=StringIO(),
+        )
+        call_command('seed_benchmark', **options)
+        call_command('seed_benchmark', prefix='more', **options)
+        self.assertEqual(Group.objects.count(), 4)
+        self.assertEqual(Post.objects.count(), 8)
+        with self.assertRaisesMessage(CommandError, 'уже занят'):
+            call_command('seed_benchmark', **options)
+
+    def test_run_and_compare(self):
+        '''Прогон покрывает адреса posts/urls.py, а сравнение
+        с базовым прогоном ловит рост числа запросов'''
+        call_command(
+            'seed_benchmark', users=4, groups=1, posts=5, comments=3,
+            images=0, stdout=StringIO(),
+        )
+        follows = self.snapshot()[1]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'baseline.json')
+            call_command(
+                'benchmark', requests=2, warmup=0, save=path,
+                stdout=StringIO(),
+            )
+            with open(path, encoding='utf-8') as file:
+                baseline = json.load(file)
+            self.assertEqual(baseline['index']['status'], 200)
+            self.assertIn('p99_ms', baseline['post_detail'])
+            self.assertNotIn('profile_follow', baseline)
+            self.assertEqual(self.snapshot()[1], follows)
+            baseline['index']['queries'] = -1
+            with open(path, 'w', encoding='utf-8') as file:
+                json.dump(baseline, file)
+            with self.assertRaisesMessage(CommandError, 'index: запросов'):
+                call_command(
+                    'benchmark', requests=2, warmup=0, baseline=path,
+                    tolerance=100, stdout=StringIO(),
+                )
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(benchmark.percentile(values, 50), 50)
+        self.assertEqual(benchmark.percentile(values, 99), 99)
+        self.assertEqual(benchmark.percentile([5], 95), 5)
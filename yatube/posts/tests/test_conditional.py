@@ -0,0 +1,110 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        cls.reader = User.objects.create(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.post = Post.objects.create(
+            author=cls.author, text='Пост', group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.guest = Client()
+        self.member = Client()
+        self.member.force_login(self.reader)
+
+    def urls(self):
+        return {
+            'index': reverse('posts:index'),
+            'group': reverse('posts:group_list', args=[self.group.slug]),
+            'profile': reverse('posts:profile', args=[self.author.username]),
+            'detail': reverse('posts:post_detail', args=[self.post.pk]),
+        }
+
+    def revalidate(self, client, url):
+        etag = client.get(url)['ETag']
+        return client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_not_modified(self):
+        '''Неизменившаяся страница отдаётся как 304'''
+        for name, url in self.urls().items():
+            with self.subTest(page=name):
+                response = self.revalidate(self.guest, url)
+                self.assertEqual(response.status_code, 304)
+
+    def test_not_modified_skips_posts(self):
+        '''Ответ 304 для ленты не читает таблицы постов'''
+        url = reverse('posts:index')
+        etag = self.guest.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.guest.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_last_modified(self):
+        response = self.guest.get(reverse('posts:index'))
+        response = self.guest.get(
+            reverse('posts:index'),
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified'],
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse(
+            self.member.get(reverse('posts:index')).has_header(
+                'Last-Modified'))
+
+    def test_etag_depends_on_user_and_page(self):
+        url = reverse('posts:index')
+        etags = {
+            self.guest.get(url)['ETag'],
+            self.member.get(url)['ETag'],
+            self.guest.get(url, {'page': 2})['ETag'],
+        }
+        self.assertEqual(len(etags), 3)
+
+    def test_etag_depends_on_csrf_token(self):
+        '''После нового входа токен CSRF другой: страница с формой
+        отдаётся заново, а не как 304 с устаревшим токеном'''
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        self.member.get(url)
+        etag = self.member.get(url)['ETag']
+        self.member.cookies[settings.CSRF_COOKIE_NAME] = 'rotated'
+        response = self.member.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_changes_invalidate(self):
+        '''Новые посты, комментарии и подписки меняют ETag'''
+        urls = self.urls()
+        changes = (
+            (urls['index'], lambda: Post.objects.create(
+                author=self.reader, text='Новый')),
+            (urls['group'], lambda: Post.objects.create(
+                author=self.reader, text='В группе', group=self.group)),
+            (urls['detail'], lambda: Comment.objects.create(
+                post=self.post, author=self.reader, text='Комментарий')),
+            (urls['profile'], lambda: Follow.objects.create(
+                user=self.reader, author=self.author)),
+        )
+        for url, change in changes:
+            with self.subTest(url=url):
+                etag = self.member.get(url)['ETag']
+                change()
+                response = self.member.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_missing_pages(self):
+        self.assertEqual(self.guest.get(
+            reverse('posts:post_detail', args=[0])).status_code, 404)
+        self.assertEqual(self.guest.get(
+            reverse('posts:profile', args=['nobody'])).status_code, 404)
@@ -0,0 +1,78 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+
+from posts import counts
+from posts.models import Group, Post
+from posts.utils import CursorPaginator
+
+User = get_user_model()
+
+
+class CountProviderTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='user')
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other-slug',
+            description='Тестовое описание',
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_scope_count_follows_signals(self):
+        '''Закешированный счётчик обновляется при создании
+        и удалении постов без повторного COUNT(*)'''
+        provider = counts.CountProvider('all')
+        self.assertEqual(provider.count(Post.objects.all()), 0)
+        post = Post.objects.create(author=self.user, text='Пост')
+        Post.objects.create(author=self.user, text='Ещё пост')
+        with self.assertNumQueries(0):
+            self.assertEqual(provider.count(Post.objects.all()), 2)
+        post.delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(provider.count(Post.objects.all()), 1)
+
+    def test_group_count_follows_group_change(self):
+        '''Перенос поста в другую группу меняет оба счётчика'''
+        post = Post.objects.create(
+            author=self.user, text='Пост', group=self.group)
+        group_count = counts.CountProvider(f'group:{self.group.pk}')
+        other_count = counts.CountProvider(f'group:{self.other_group.pk}')
+        self.assertEqual(group_count.count(self.group.posts.all()), 1)
+        self.assertEqual(other_count.count(self.other_group.posts.all()), 0)
+        post.group = self.other_group
+        post.save()
+        self.assertEqual(group_count.count(self.group.posts.all()), 0)
+        self.assertEqual(other_count.count(self.other_group.posts.all()), 1)
+
+    @mock.patch.object(counts, 'COUNT_ESTIMATE_THRESHOLD', 1)
+    def test_estimate_above_threshold(self):
+        '''Выше порога для всей таблицы берётся оценка по наибольшему id'''
+        posts = [
+            Post.objects.create(author=self.user, text=f'Пост {i}')
+            for i in range(3)
+        ]
+        posts[0].delete()
+        provider = counts.CountProvider('all')
+        self.assertEqual(provider.count(Post.objects.all()), posts[-1].pk)
+
+    def test_page_window(self):
+        '''Номера страниц выводятся окном вокруг текущей'''
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        paginator.count = 1000
+        self.assertEqual(list(paginator.page_window(1)), [1, 2, 3, 4])
+        self.assertEqual(
+            list(paginator.page_window(50)), list(range(47, 54)))
+        self.assertEqual(
+            list(paginator.page_window(100)), [97, 98, 99, 100])
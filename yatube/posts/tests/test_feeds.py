@@ -0,0 +1,63 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Follow, Group, Post
+
+User = get_user_model()
+
+FEED_QUERY_BUDGET = 8
+
+
+@override_settings(FEED_QUERY_BUDGET=FEED_QUERY_BUDGET)
+class FeedQueryBudgetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='reader')
+        cls.authors = [
+            User.objects.create(
+                username=f'author{i}', first_name='Имя', last_name='Фамилия')
+            for i in range(3)
+        ]
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        for i in range(15):
+            Post.objects.create(
+                author=cls.authors[i % 3],
+                text=f'Тестовый текст {i}',
+                group=cls.group,
+            )
+        for author in cls.authors:
+            Follow.objects.create(user=cls.user, author=author)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_feed_views_fit_query_budget(self):
+        '''Ленты укладываются в фиксированный бюджет запросов
+        независимо от числа постов на странице'''
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:index') + '?page=2',
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': 'author0'}),
+            reverse('posts:follow_index'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response.context['page_obj'])
+
+    def test_budget_violation_fails(self):
+        '''Превышение бюджета приводит к ошибке'''
+        with self.settings(FEED_QUERY_BUDGET=1):
+            with self.assertRaises(AssertionError):
+                self.authorized_client.get(reverse('posts:follow_index'))
@@ -0,0 +1,77 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from posts import follows
+from posts.models import Follow
+
+User = get_user_model()
+
+
+class FollowGraphTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='user')
+        cls.authors = [
+            User.objects.create(username=f'author{i}') for i in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_follow_is_unique(self):
+        '''Повторная подписка не создаёт дубликатов'''
+        self.assertTrue(follows.follow(self.user, self.authors[0]))
+        self.assertFalse(follows.follow(self.user, self.authors[0]))
+        self.assertFalse(follows.follow(self.user, self.user))
+        self.assertEqual(Follow.objects.count(), 1)
+        with self.assertRaises(IntegrityError):
+            Follow.objects.create(user=self.user, author=self.authors[0])
+
+    def test_bulk_is_following(self):
+        '''Состояние подписки на нескольких авторов — одним обращением'''
+        follows.follow(self.user, self.authors[1])
+        follows.following_ids(self.user.pk)
+        with self.assertNumQueries(0):
+            state = follows.is_following(self.user, self.authors)
+        self.assertEqual(state, {
+            self.authors[0].pk: False,
+            self.authors[1].pk: True,
+            self.authors[2].pk: False,
+        })
+
+    def test_unfollow_without_follow(self):
+        '''Отписка от автора без подписки не падает'''
+        self.client.force_login(self.user)
+        response = self.client.get(reverse(
+            'posts:profile_unfollow', kwargs={'username': 'author0'}))
+        self.assertRedirects(
+            response,
+            reverse('posts:profile', kwargs={'username': 'author0'}))
+
+
+class FollowCacheTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='user')
+        self.author = User.objects.create(username='author')
+
+    def test_cached_sets_reset_on_commit(self):
+        '''Закешированные множества сбрасываются после коммита
+        (от)писки и перечитываются уже с изменением'''
+        self.assertEqual(follows.following_ids(self.user.pk), frozenset())
+        self.assertEqual(follows.follower_ids(self.author.pk), frozenset())
+        with transaction.atomic():
+            follows.follow(self.user, self.author)
+            self.assertEqual(
+                follows.following_ids(self.user.pk), frozenset())
+        self.assertEqual(
+            follows.following_ids(self.user.pk), {self.author.pk})
+        self.assertEqual(
+            follows.follower_ids(self.author.pk), {self.user.pk})
+        follows.unfollow(self.user, self.author)
+        self.assertEqual(follows.following_ids(self.user.pk), set())
+        self.assertEqual(follows.follower_ids(self.author.pk), set())
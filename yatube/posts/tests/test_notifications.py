@@ -0,0 +1,116 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from core.models import Job
+from posts import notifications
+from posts.constants import DIGEST_DELAY
+from posts.models import Digest, Follow, Notification, Post
+
+User = get_user_model()
+
+
+class NotificationsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(
+            username='author', first_name='Лев', last_name='Толстой')
+        cls.followers = [
+            User.objects.create(username=f'reader{number}', email=email)
+            for number, email in enumerate(['a@a.ru', 'b@b.ru', ''])
+        ]
+        for follower in cls.followers:
+            Follow.objects.create(user=follower, author=cls.author)
+
+    def test_fan_out_in_chunks(self):
+        '''Уведомления раскладываются порциями по подписчикам'''
+        with mock.patch('posts.notifications.NOTIFY_CHUNK_SIZE', 2):
+            post = Post.objects.create(author=self.author, text='Пост')
+        self.assertEqual(
+            set(Notification.objects.filter(post=post).values_list(
+                'user', flat=True)),
+            {follower.pk for follower in self.followers},
+        )
+
+    def test_burst_is_one_digest(self):
+        '''Несколько постов подряд уходят одним письмом,
+        и только после окна накопления'''
+        Post.objects.create(author=self.author, text='Первый пост')
+        Post.objects.create(author=self.author, text='Второй пост')
+        self.assertEqual(notifications.send_digests(), 0)
+        out = StringIO()
+        call_command('send_digests', delay=0, stdout=out)
+        self.assertIn('Отправлено писем: 2', out.getvalue())
+        self.assertEqual(
+            sorted(message.to[0] for message in mail.outbox),
+            ['a@a.ru', 'b@b.ru'])
+        body = mail.outbox[0].body
+        self.assertIn('Первый пост', body)
+        self.assertIn('Второй пост', body)
+        self.assertIn('Лев Толстой', body)
+        self.assertEqual(Digest.objects.count(), 3)
+        self.assertFalse(
+            Notification.objects.filter(digest__isnull=True).exists())
+        self.assertEqual(notifications.send_digests(0), 0)
+
+    def test_send_is_deferred(self):
+        '''Пост не рассылает сводки в запросе: рассылка ждёт
+        в очереди до конца окна накопления'''
+        with mock.patch('posts.notifications.send_digests') as send:
+            Post.objects.create(author=self.author, text='Пост')
+        send.assert_not_called()
+        job = Job.objects.get(name='posts.send_digests')
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertGreater(job.run_at, timezone.now())
+
+    def test_pending_rescheduled(self):
+        '''После рассылки следующий запуск ставится на срок самого
+        старого уведомления, окно которого ещё не истекло'''
+        other = User.objects.create(username='other')
+        reader = User.objects.create(username='late', email='c@c.ru')
+        Follow.objects.create(user=reader, author=other)
+        Post.objects.create(author=self.author, text='Ранний пост')
+        Notification.objects.update(
+            created=timezone.now() - timedelta(seconds=DIGEST_DELAY + 60))
+        Post.objects.create(author=other, text='Поздний пост')
+        late = Notification.objects.get(user=reader)
+        # Запуск, который сейчас выполняется, из очереди уже забран.
+        Job.objects.filter(name='posts.send_digests').delete()
+        self.assertEqual(notifications.send_digests(), 2)
+        job = Job.objects.get(name='posts.send_digests', status=Job.QUEUED)
+        due = late.created + timedelta(seconds=DIGEST_DELAY)
+        self.assertLess(abs((job.run_at - due).total_seconds()), 2)
+
+    def test_failed_send_is_retried(self):
+        '''Сводки, собранные запуском, который упал на отправке,
+        досылаются следующим'''
+        Post.objects.create(author=self.author, text='Пост')
+        with mock.patch(
+            'django.core.mail.backends.locmem.EmailBackend.send_messages',
+            side_effect=ConnectionError,
+        ):
+            with self.assertRaises(ConnectionError):
+                notifications.send_digests(0)
+        self.assertEqual(notifications.send_digests(0), 2)
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertFalse(Digest.objects.filter(sent__isnull=True).exists())
+        self.assertFalse(
+            Notification.objects.filter(digest__isnull=True).exists())
+
+    def test_digests_built_per_batch(self):
+        '''Сборка пачки сводок не зависит от числа пользователей'''
+        Post.objects.create(author=self.author, text='Пост')
+        user_ids = [follower.pk for follower in self.followers]
+        with self.assertNumQueries(3):
+            digests = notifications.build_digests(user_ids, timezone.now())
+        self.assertEqual(
+            sorted(digest.user_id for digest in digests), user_ids)
+        self.assertEqual(
+            Notification.objects.filter(digest__in=digests).count(), 3)
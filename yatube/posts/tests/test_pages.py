@@ -0,0 +1,90 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Follow, Post
+
+User = get_user_model()
+
+
+class PageCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        cls.reader = User.objects.create(username='reader')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.guest = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_guest_page_cached_whole(self):
+        '''Повторная страница для гостя отдаётся из кеша без запросов,
+        новый пост сбрасывает её'''
+        url = reverse('posts:index')
+        self.guest.get(url)
+        with self.assertNumQueries(0):
+            response = self.guest.get(url)
+        self.assertContains(response, 'Пост')
+        Post.objects.create(author=self.author, text='Свежий пост')
+        self.assertContains(self.guest.get(url), 'Свежий пост')
+
+    def test_guest_profile_without_queries(self):
+        '''Профиль для гостя тоже отдаётся из кеша без запросов,
+        а параметры, которые страница не читает, кеш не дробят'''
+        url = reverse('posts:profile', args=[self.author.username])
+        self.guest.get(url)
+        with self.assertNumQueries(0):
+            response = self.guest.get(url + '?utm_source=mail')
+        self.assertContains(response, 'Пост')
+
+    def test_profiled_page_not_shared(self):
+        '''Страница с панелью профилирования не попадает в кеш гостей'''
+        url = reverse('posts:index')
+        with override_settings(DEBUG=True), self.assertLogs('core.profile'):
+            self.assertContains(self.guest.get(url), 'profile-overlay')
+        self.assertNotContains(self.guest.get(url), 'profile-overlay')
+
+    def test_post_skeleton_is_personalized(self):
+        '''Скелет поста общий, а ссылка на правку и форма
+        комментария подставляются для каждого пользователя'''
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        response = self.author_client.get(url)
+        self.assertContains(response, 'Редактировать запись')
+        self.assertContains(response, 'csrfmiddlewaretoken')
+        response = self.reader_client.get(url)
+        self.assertTemplateNotUsed(response, 'posts/post_detail.html')
+        self.assertNotContains(response, 'Редактировать запись')
+        self.assertContains(response, 'Добавить комментарий')
+        self.assertContains(response, 'Пользователь: reader')
+        self.assertNotContains(response, 'Пользователь: author')
+        response = self.guest.get(url)
+        self.assertNotContains(response, 'Добавить комментарий')
+        self.assertNotContains(response, 'csrfmiddlewaretoken')
+        self.assertNotContains(response, '<!--hole:')
+
+    def test_follow_button_is_personalized(self):
+        '''Кнопка подписки на общем скелете профиля своя у каждого'''
+        url = reverse('posts:profile', args=[self.author.username])
+        self.assertContains(self.reader_client.get(url), 'Отписаться')
+        response = self.author_client.get(url)
+        self.assertTemplateNotUsed(response, 'posts/profile.html')
+        self.assertContains(response, 'Подписаться')
+        self.assertNotContains(response, 'Отписаться')
+
+    def test_switcher_is_personalized(self):
+        '''Переключатель лент на общем скелете главной виден только
+        вошедшим, кто бы ни отрисовал скелет первым'''
+        url = reverse('posts:index')
+        self.assertNotContains(self.guest.get(url), 'Избранные авторы')
+        self.assertContains(self.reader_client.get(url), 'Избранные авторы')
+        cache.clear()
+        self.assertContains(self.reader_client.get(url), 'Избранные авторы')
+        self.assertNotContains(self.guest.get(url), 'Избранные авторы')
@@ -0,0 +1,107 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.constants import PER_PAGE
+from posts.models import Comment, Post
+from posts.search import SearchResults, rebuild
+
+User = get_user_model()
+
+
+class SearchIndexTest(TestCase):
+    '''Индекс FTS5; тот же набор проверок гоняется
+    для запасного индекса SearchTerm ниже'''
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='author')
+
+    def setUp(self):
+        cache.clear()
+        self.in_text = Post.objects.create(
+            author=self.user, text='Кошка спит на диване')
+        self.in_comment = Post.objects.create(
+            author=self.user, text='Фото с дачи')
+        Comment.objects.create(
+            post=self.in_comment, author=self.user, text='Какая кошка!')
+        Post.objects.create(author=self.user, text='Собака гуляет')
+
+    def search(self, query):
+        results = SearchResults(query)
+        return results.count(), [post.pk for post in results[0:PER_PAGE]]
+
+    def test_ranks_text_above_comments(self):
+        '''Слово из текста поста весит больше, чем из комментария'''
+        self.assertEqual(
+            self.search('кошка'), (2, [self.in_text.pk, self.in_comment.pk]))
+
+    def test_all_terms_required(self):
+        '''Пост находится, только если в нём есть все слова запроса'''
+        self.assertEqual(self.search('кошка диване'), (1, [self.in_text.pk]))
+        self.assertEqual(self.search('кошка собака'), (0, []))
+        self.assertEqual(self.search('  !!! '), (0, []))
+
+    def test_index_follows_writes(self):
+        '''Правка и удаление постов и комментариев обновляют индекс'''
+        self.in_text.text = 'Кот спит'
+        self.in_text.save()
+        self.in_comment.comments.all().delete()
+        self.assertEqual(self.search('кошка'), (0, []))
+        self.assertEqual(self.search('кот'), (1, [self.in_text.pk]))
+        self.in_text.delete()
+        self.assertEqual(self.search('кот'), (0, []))
+
+    def test_rebuild(self):
+        '''Перестроенный индекс находит то же самое'''
+        rebuild()
+        self.assertEqual(self.search('кошка')[0], 2)
+
+
+class SearchTermIndexTest(SearchIndexTest):
+    def setUp(self):
+        patcher = mock.patch('posts.search.uses_fts', return_value=False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        super().setUp()
+
+
+class SearchViewTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='author')
+        for number in range(PER_PAGE + 3):
+            Post.objects.create(author=cls.user, text=f'Кошка номер {number}')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_search_page(self):
+        '''Страница поиска листается номерами и не теряет запрос'''
+        response = self.client.get(reverse('posts:search'), {'q': 'кошка'})
+        self.assertEqual(len(response.context['page_obj']), PER_PAGE)
+        self.assertContains(
+            response, '?q=%D0%BA%D0%BE%D1%88%D0%BA%D0%B0&page=2')
+        response = self.client.get(
+            reverse('posts:search'), {'q': 'кошка', 'page': 2})
+        self.assertEqual(len(response.context['page_obj']), 3)
+
+    def test_empty_query(self):
+        '''Без запроса страница открывается пустой'''
+        response = self.client.get(reverse('posts:search'))
+        self.assertEqual(len(response.context['page_obj']), 0)
+        self.assertNotContains(response, 'Ничего не найдено')
+
+    def test_admin_uses_index(self):
+        '''Поиск в админке постов идёт по индексу'''
+        admin = User.objects.create_superuser('admin', 'a@a.ru', 'pass')
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'номер 1'})
+        self.assertEqual(response.context['cl'].result_count, 1)
@@ -0,0 +1,80 @@
+import random
+import shutil
+import tempfile
+from collections import Counter
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import F
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from posts.models import Comment, Follow, Group, Post, User, UserStats
+from posts.search import SearchResults
+from posts.seeding import Popularity
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+OPTIONS = dict(
+    users=30, groups=3, posts=120, comments=200, follows=150,
+    batch_size=50, seed=3, stdout=StringIO(),
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class SeedYatubeTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def snapshot(self):
+        return list(Post.objects.order_by('pk').values_list(
+            'author__username', 'group__slug', 'text', 'pub_date'))
+
+    def test_seed(self):
+        '''Все строки созданы пачками, производные данные пересчитаны'''
+        call_command(
+            'seed_yatube', images=0.5, image_corpus=2, **OPTIONS)
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 120)
+        self.assertEqual(Comment.objects.count(), 200)
+        self.assertTrue(Follow.objects.exists())
+        self.assertFalse(Follow.objects.filter(user=F('author')).exists())
+        self.assertEqual(UserStats.objects.count(), 30)
+        self.assertGreater(
+            Post.objects.values('pub_date').distinct().count(), 100)
+        self.assertTrue(Post.objects.exclude(image='').exists())
+        word = Post.objects.first().text.split()[0]
+        self.assertTrue(SearchResults(word).count())
+
+    def test_seed_is_deterministic(self):
+        '''При одном seed получается тот же набор'''
+        call_command('seed_yatube', skip_derived=True, **OPTIONS)
+        first = self.snapshot()
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        call_command('seed_yatube', skip_derived=True, **OPTIONS)
+        second = self.snapshot()
+        self.assertEqual(
+            [row[:3] for row in second], [row[:3] for row in first])
+
+
+class PopularityTest(SimpleTestCase):
+    def test_zipf_over_range(self):
+        '''Id выбираются из диапазона без списка весов,
+        и самые популярные встречаются намного чаще остальных'''
+        ids = range(100, 1100)
+        popular = Popularity(ids, 1.1, random.Random(0))
+        picks = Counter(popular.pick() for _ in range(20000))
+        self.assertTrue(set(picks) <= set(ids))
+        top_count = picks.most_common(1)[0][1]
+        self.assertGreater(top_count, 20 * 20000 / len(ids))
+        ranks = Counter(popular.rank() for _ in range(20000))
+        self.assertGreater(ranks[0], ranks[1])
+        self.assertEqual(Popularity(range(7, 8), 1, random.Random()).pick(), 7)
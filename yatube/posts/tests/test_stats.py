@@ -0,0 +1,109 @@
+from importlib import import_module
+from io import StringIO
+from unittest import mock
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Post, UserStats
+from posts import stats
+from posts.stats import get_stats
+
+User = get_user_model()
+
+
+class UserStatsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='user')
+        cls.author = User.objects.create(username='author')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+
+    def assertStats(self, user, **expected):
+        stats = UserStats.objects.get(user=user)
+        for field, value in expected.items():
+            with self.subTest(field=field):
+                self.assertEqual(getattr(stats, field), value)
+
+    def test_counters_follow_writes(self):
+        '''Счётчики меняются вместе с постами, комментариями
+        и подписками'''
+        get_stats(self.user)
+        get_stats(self.author)
+        Post.objects.create(author=self.author, text='Ещё пост')
+        comment = Comment.objects.create(
+            post=self.post, author=self.user, text='Комментарий')
+        follow = Follow.objects.create(user=self.user, author=self.author)
+        self.assertStats(self.author, posts_count=2, followers_count=1)
+        self.assertStats(self.user, comments_count=1, following_count=1)
+        comment.delete()
+        follow.delete()
+        self.assertStats(self.author, posts_count=2, followers_count=0)
+        self.assertStats(self.user, comments_count=0, following_count=0)
+
+    def test_recount_repairs_drift(self):
+        '''Команда recount исправляет рассинхронизацию'''
+        get_stats(self.author)
+        UserStats.objects.filter(user=self.author).update(posts_count=42)
+        call_command('recount', stdout=StringIO())
+        self.assertStats(self.author, posts_count=1)
+
+    def test_pages_do_not_count_posts(self):
+        '''Профиль и страница поста не выполняют агрегатных запросов'''
+        get_stats(self.author)
+        urls = (
+            reverse('posts:profile', kwargs={'username': 'author'}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url)
+                self.assertContains(response, 'Пост')
+                self.assertFalse(any(
+                    'COUNT(' in query['sql']
+                    for query in queries.captured_queries
+                ))
+
+    def test_new_user_has_row(self):
+        '''Строка счётчиков создаётся при регистрации, и первые
+        изменения не теряются'''
+        user = User.objects.create(username='new')
+        Post.objects.create(author=user, text='Первый пост')
+        self.assertStats(user, posts_count=1)
+
+    def test_lazy_recount_does_not_conflict(self):
+        '''Если строки нет, чтение вставляет её без удаления:
+        строка, вставленная параллельным чтением, не мешает'''
+        UserStats.objects.filter(user=self.author).delete()
+        counted = stats.counted
+
+        def racing(users):
+            rows = counted(users)
+            # Параллельное первое чтение успело вставить строку.
+            UserStats.objects.bulk_create(counted(users))
+            return rows
+
+        with mock.patch('posts.stats.counted', racing):
+            self.assertEqual(get_stats(self.author).posts_count, 1)
+
+    def test_migration_backfills_rows(self):
+        '''Миграция, создающая счётчики, заполняет их для
+        существующих пользователей'''
+        migration = import_module('posts.migrations.0011_userstats')
+        Follow.objects.create(user=self.user, author=self.author)
+        UserStats.objects.all().delete()
+        with mock.patch.object(migration, 'BATCH_SIZE', 1):
+            migration.backfill_stats(apps, None)
+        self.assertStats(self.author, posts_count=1, followers_count=1)
+        self.assertStats(self.user, following_count=1)
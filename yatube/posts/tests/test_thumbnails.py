@@ -0,0 +1,98 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import stamps, thumbnails
+from posts.models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='author')
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile(
+                name='small.gif', content=SMALL_GIF, content_type='image/gif'
+            ),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        shutil.rmtree(
+            os.path.join(TEMP_MEDIA_ROOT, 'cache'), ignore_errors=True
+        )
+        self.client = Client()
+
+    def test_placeholder_until_generated(self):
+        '''Пока миниатюры нет, лента выводит заглушку
+        и не режет картинку сама и не ставит задачу при каждом запросе'''
+        with mock.patch('posts.thumbnails.schedule') as schedule:
+            response = self.client.get(reverse('posts:index'))
+        schedule.assert_not_called()
+        self.assertContains(response, 'aspect-ratio: 960 / 339')
+        self.assertNotContains(response, 'cache/')
+
+    def test_generated_thumbnail_is_shown(self):
+        '''Нарезанная воркером миниатюра попадает в ленту'''
+        thumbnails.generate(self.post.image.name, ['all'])
+        self.assertTrue(thumbnails.is_ready(self.post.image.name))
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, '<img class="card-img my-2"')
+
+    # Версии, сдвинутые потоком пула, видны сразу, а не через
+    # SYNC_INTERVAL.
+    @override_settings(CACHES={'default': {
+        **settings.CACHES['default'],
+        'OPTIONS': {**settings.CACHES['default']['OPTIONS'],
+                    'SYNC_INTERVAL': 0},
+    }})
+    def test_cached_placeholder_replaced(self):
+        '''Готовая миниатюра сбрасывает закешированную ленту
+        с заглушкой'''
+        url = reverse('posts:index')
+        self.assertContains(self.client.get(url), 'aspect-ratio: 960 / 339')
+        thumbnails.schedule(
+            self.post.image.name, stamps.post_scopes(self.post))
+        thumbnails.wait_scheduled()
+        self.assertTrue(thumbnails.is_ready(self.post.image.name))
+        self.assertContains(self.client.get(url), '<img class="card-img my-2"')
+
+    def test_command_generates_missing(self):
+        '''Команда generate_thumbnails режет миниатюры
+        для уже загруженных картинок'''
+        out = StringIO()
+        call_command('generate_thumbnails', workers=1, stdout=out)
+        self.assertIn('готово: 1', out.getvalue())
+        self.assertTrue(thumbnails.is_ready(self.post.image.name))
@@ -0,0 +1,101 @@
+from importlib import import_module
+from unittest import mock
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts import timeline
+from posts.models import Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create(username='reader')
+        cls.author = User.objects.create(username='author')
+        cls.stranger = User.objects.create(username='stranger')
+
+    def feed(self):
+        return list(timeline.timeline_posts(self.reader))
+
+    def test_new_post_is_pushed_to_followers(self):
+        '''Новый пост попадает в ленты подписчиков и только в них'''
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        Post.objects.create(author=self.stranger, text='Чужой пост')
+        self.assertEqual(self.feed(), [post])
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+
+    def test_deleted_post_leaves_timeline(self):
+        '''Удалённый пост пропадает из ленты'''
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Пост')
+        post.delete()
+        self.assertEqual(self.feed(), [])
+        self.assertFalse(TimelineEntry.objects.exists())
+
+    def test_follow_backfills_and_unfollow_trims(self):
+        '''Подписка добавляет старые посты автора, отписка их убирает'''
+        posts = [
+            Post.objects.create(author=self.author, text=f'Пост {i}')
+            for i in range(3)
+        ]
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertCountEqual(self.feed(), posts)
+        follow.delete()
+        self.assertEqual(self.feed(), [])
+
+    @mock.patch.object(timeline, 'FANOUT_FOLLOWERS_LIMIT', 1)
+    def test_popular_author_is_pulled_on_read(self):
+        '''Посты популярного автора не раскладываются,
+        но читаются из ленты'''
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Пост')
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.feed(), [post])
+
+    @mock.patch.object(timeline, 'FANOUT_FOLLOWERS_LIMIT', 2)
+    def test_popularity_change_rebuilds_timelines(self):
+        '''Пересечение порога популярности перестраивает ленты:
+        посты, написанные, пока автор был популярен, не теряются'''
+        Follow.objects.create(user=self.reader, author=self.author)
+        first = Post.objects.create(author=self.author, text='Первый')
+        extra = Follow.objects.create(user=self.stranger, author=self.author)
+        self.assertFalse(TimelineEntry.objects.exists())
+        second = Post.objects.create(author=self.author, text='Второй')
+        self.assertCountEqual(self.feed(), [first, second])
+        extra.delete()
+        self.assertCountEqual(self.feed(), [first, second])
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 2)
+
+    def test_rebuild_command(self):
+        '''Команда rebuild_timelines восстанавливает ленты'''
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Пост')
+        TimelineEntry.objects.all().delete()
+        call_command('rebuild_timelines', stdout=mock.MagicMock())
+        self.assertEqual(self.feed(), [post])
+
+    def test_migration_backfills_existing_follows(self):
+        '''Миграция, создающая ленты, заполняет их по уже
+        существующим подпискам'''
+        migration = import_module('posts.migrations.0010_timelineentry')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.stranger, author=self.author)
+        posts = [
+            Post.objects.create(author=self.author, text=f'Пост {number}')
+            for number in range(3)
+        ]
+        TimelineEntry.objects.all().delete()
+        with mock.patch.object(migration, 'TIMELINE_BATCH_SIZE', 2):
+            migration.backfill_timelines(apps, None)
+        self.assertEqual(set(self.feed()), set(posts))
+        self.assertEqual(TimelineEntry.objects.count(), 6)
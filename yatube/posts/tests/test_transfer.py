@@ -0,0 +1,132 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts import archive, transfer
+from posts.models import (
+    ArchivedComment, ArchivedPost, Comment, Follow, Group, Post, User,
+)
+
+
+class TransferTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        call_command(
+            'seed_yatube', users=12, groups=2, posts=40, comments=60,
+            follows=30, batch_size=20, skip_derived=True, stdout=StringIO(),
+        )
+
+    def snapshot(self):
+        return (
+            list(Post.objects.order_by('pub_date', 'text').values_list(
+                'author__username', 'group__slug', 'text', 'pub_date')),
+            sorted(Comment.objects.values_list(
+                'post__text', 'author__username', 'text', 'created')),
+            sorted(Follow.objects.values_list(
+                'user__username', 'author__username')),
+        )
+
+    def export(self, name):
+        path = os.path.join(self.directory, name)
+        call_command('export_yatube', path, chunk_size=7, stderr=StringIO())
+        return path
+
+    def wipe(self):
+        User.objects.all().delete()
+        Group.objects.all().delete()
+
+    def test_round_trip(self):
+        '''Выгрузка в gzip и загрузка в пустую базу сохраняют данные
+        и связи, хотя id строк меняются'''
+        before = self.snapshot()
+        path = self.export('dump.ndjson.gz')
+        self.wipe()
+        User.objects.create(username='someone')
+        call_command(
+            'import_yatube', path, batch_size=9, stdout=StringIO())
+        self.assertEqual(self.snapshot(), before)
+
+    def test_archive_round_trip(self):
+        '''Архивные посты и комментарии выгружаются и после загрузки
+        снова лежат в архиве, не пересекаясь с живыми постами'''
+        old = list(Post.objects.order_by('pk').values_list(
+            'pk', flat=True)[:10])
+        archive.archive_batch(old)
+        archived = sorted(ArchivedPost.objects.values_list(
+            'author__username', 'text', 'pub_date', 'group__slug'))
+        comments = sorted(ArchivedComment.objects.values_list(
+            'post__text', 'author__username', 'text', 'created'))
+        before = self.snapshot()
+        path = self.export('dump.ndjson')
+        self.wipe()
+        call_command(
+            'import_yatube', path, batch_size=9, stdout=StringIO())
+        self.assertEqual(self.snapshot(), before)
+        self.assertEqual(sorted(ArchivedPost.objects.values_list(
+            'author__username', 'text', 'pub_date', 'group__slug')), archived)
+        self.assertEqual(sorted(ArchivedComment.objects.values_list(
+            'post__text', 'author__username', 'text', 'created')), comments)
+        self.assertFalse(Post.objects.filter(
+            pk__in=ArchivedPost.objects.values('pk')).exists())
+
+    def test_resume(self):
+        '''Прерванная загрузка продолжается без дублей'''
+        before = self.snapshot()
+        path = self.export('dump.ndjson')
+        self.wipe()
+        flush = transfer.Importer.flush
+        calls = []
+
+        def failing(importer, *args):
+            calls.append(args)
+            if len(calls) == 5:
+                raise RuntimeError('обрыв')
+            flush(importer, *args)
+
+        with mock.patch.object(transfer.Importer, 'flush', failing):
+            with self.assertRaises(RuntimeError):
+                call_command(
+                    'import_yatube', path, batch_size=9, stdout=StringIO())
+        call_command('import_yatube', path, batch_size=9, stdout=StringIO())
+        self.assertEqual(self.snapshot(), before)
+
+    def test_resume_after_database_commit(self):
+        '''Обрыв между коммитом пачки в базе и записью состояния
+        не дублирует её при продолжении'''
+        before = self.snapshot()
+        path = self.export('dump.ndjson')
+        self.wipe()
+        save = transfer.Importer.save
+        saved = []
+
+        def failing(importer, name, *args):
+            saved.append(name)
+            if saved.count('post') == 2:
+                raise RuntimeError('обрыв')
+            save(importer, name, *args)
+
+        with mock.patch.object(transfer.Importer, 'save', failing):
+            with self.assertRaises(RuntimeError):
+                call_command(
+                    'import_yatube', path, batch_size=9, stdout=StringIO())
+        call_command('import_yatube', path, batch_size=9, stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 40)
+        self.assertEqual(self.snapshot(), before)
+
+    def test_existing_users_reused(self):
+        '''Пользователи и группы с теми же username и slug
+        не дублируются, а связываются с загруженными постами'''
+        path = self.export('dump.ndjson')
+        Post.objects.all().delete()
+        call_command(
+            'import_yatube', path, skip_derived=True, stdout=StringIO())
+        self.assertEqual(User.objects.count(), 12)
+        self.assertEqual(Post.objects.count(), 40)
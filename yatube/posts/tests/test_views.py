@@ -1,5 +1,7 @@
 from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from posts.models import Post, Group, Comment, Follow
@@ -50,6 +52,7 @@ class StaticURLTests(TestCase):
         )
 
     def setUp(self):
+        cache.clear()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
         self.new_authorized_client = Client()
@@ -141,19 +144,30 @@ class StaticURLTests(TestCase):
         self.assertEqual(post.text, 'Тестовый текст комментария')
 
     def test_cache_work_correct(self):
-        '''Список записей хранится в кеше и обновляется раз в 20 секунд'''
+        '''Фрагмент ленты берётся из кеша, пока посты не менялись,
+        и сбрасывается сигналом удаления поста'''
         post = Post.objects.create(
             author=self.user,
             text='Тестовый текст',
         )
         response = self.authorized_client.get(reverse('posts:index')).content
-        post.delete()
+        Post.objects.filter(pk=post.pk).update(text='Текст без сигналов')
         response_1 = self.authorized_client.get(reverse('posts:index')).content
         self.assertEqual(response, response_1)
-        cache.clear()
+        post.delete()
         response_2 = self.authorized_client.get(reverse('posts:index')).content
         self.assertNotEqual(response_2, response)
 
+    def test_cache_is_page_aware(self):
+        '''Разные страницы ленты кешируются отдельно'''
+        for i in range(12):
+            Post.objects.create(author=self.user, text=f'Пост {i}')
+        first = self.authorized_client.get(reverse('posts:index'))
+        second = self.authorized_client.get(
+            reverse('posts:index') + '?page=2')
+        self.assertNotContains(first, 'Пост 0')
+        self.assertContains(second, 'Пост 0')
+
     def test_follow_and_delete_correct(self):
         '''Новая запись пользователя появляется в ленте тех,
         кто на него подписан и не появляется в ленте тех, кто не подписан..'''
@@ -186,6 +200,9 @@ class PaginatorViewsTest(TestCase):
                 group=cls.group,
             )
 
+    def setUp(self):
+        cache.clear()
+
     def test_first_page_contains_ten_records_index(self):
         response = self.client.get(reverse('posts:index'))
         self.assertEqual(len(response.context['page_obj']), 10)
@@ -217,3 +234,127 @@ class PaginatorViewsTest(TestCase):
             reverse('posts:profile', kwargs={
                 'username': 'user'}) + '?page=2')
         self.assertEqual(len(response.context['page_obj']), 3)
+
+    def test_cursor_pages_do_not_overlap(self):
+        '''Переход по курсорам ?after=/?before= не теряет
+        и не повторяет записи'''
+        first = self.client.get(reverse('posts:index')).context['page_obj']
+        response = self.client.get(
+            reverse('posts:index') + f'?after={first.next_cursor}')
+        second = response.context['page_obj']
+        self.assertEqual(len(second), 3)
+        self.assertFalse(set(first) & set(second))
+        self.assertIsNone(second.next_cursor)
+        response = self.client.get(
+            reverse('posts:index') + f'?before={second.previous_cursor}')
+        self.assertEqual(list(response.context['page_obj']), list(first))
+
+    def test_cursor_page_skips_count_query(self):
+        '''Повторно первая страница ленты строится без COUNT(*)'''
+        cache.clear()
+        self.client.get(reverse('posts:index'))
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('posts:index'))
+        self.assertFalse(
+            any('COUNT(' in query['sql'] for query in queries.captured_queries)
+        )
+
+
+class GroupPostsViewTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='user')
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.group_post = Post.objects.create(
+            author=cls.user,
+            text='Пост группы',
+            group=cls.group,
+        )
+        cls.other_post = Post.objects.create(
+            author=cls.user,
+            text='Пост без группы',
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_group_page_shows_only_group_posts(self):
+        '''На странице группы только посты этой группы'''
+        response = self.client.get(
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}))
+        self.assertEqual(list(response.context['page_obj']),
+                         [self.group_post])
+
+    def test_group_lookup_is_cached(self):
+        '''Повторный запрос страницы группы не ищет группу в БД'''
+        url = reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        self.assertFalse(any(
+            'posts_group' in query['sql']
+            for query in queries.captured_queries
+        ))
+
+    def test_group_cache_follows_slug_change(self):
+        '''После смены slug старый адрес группы недоступен'''
+        group = Group.objects.get(pk=self.group.pk)
+        url = reverse('posts:group_list', kwargs={'slug': group.slug})
+        self.client.get(url)
+        group.slug = 'new-slug'
+        group.save()
+        self.assertEqual(self.client.get(url).status_code, 404)
+        response = self.client.get(
+            reverse('posts:group_list', kwargs={'slug': 'new-slug'}))
+        self.assertEqual(response.status_code, 200)
+
+
+class CommentsPaginationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='user')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+        for i in range(25):
+            author = User.objects.create(username=f'commentator{i}')
+            Comment.objects.create(
+                post=cls.post, author=author, text=f'Комментарий {i}')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_comments_are_paginated(self):
+        '''Комментарии выводятся порциями, следующая — по курсору'''
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        first = self.client.get(url).context['comments']
+        self.assertEqual(len(first), 20)
+        self.assertEqual(first[0].text, 'Комментарий 0')
+        second = self.client.get(
+            url + f'?after={first.next_cursor}').context['comments']
+        self.assertEqual(
+            [comment.text for comment in second],
+            [f'Комментарий {i}' for i in range(20, 25)])
+        self.assertIsNone(second.next_cursor)
+
+    def test_comment_authors_are_fetched_in_one_query(self):
+        '''Авторы комментариев не запрашиваются по одному'''
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        self.assertLess(len(queries), 10)
+
+    def test_comments_json(self):
+        '''JSON-эндпоинт отдаёт порцию комментариев и курсор'''
+        url = reverse('posts:post_comments', kwargs={'post_id': self.post.pk})
+        data = self.client.get(url).json()
+        self.assertEqual(len(data['comments']), 20)
+        self.assertEqual(data['comments'][0]['author'], 'commentator0')
+        data = self.client.get(url, {'after': data['next']}).json()
+        self.assertEqual(len(data['comments']), 5)
+        self.assertIsNone(data['next'])
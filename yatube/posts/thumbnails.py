@@ -0,0 +1,154 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from core import jobs
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+
+from . import stamps
+from .constants import THUMBNAIL_GEOMETRIES
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_pending = set()
+_lock = threading.Lock()
+_local = threading.local()
+
+
+class DeferredThumbnailBackend(ThumbnailBackend):
+    '''Бэкенд sorl-thumbnail, который не режет картинки во время запроса.
+
+    Готовая миниатюра берётся из key-value хранилища или, если файл
+    уже нарезан воркером, регистрируется в нём. Иначе шаблон получает
+    None и выводит заглушку из блока {% empty %}. Отрисовка генерацию
+    не ставит — иначе каждый GET писал бы задачу в БД: миниатюры режет
+    задача, поставленная при сохранении поста, а для старых картинок —
+    команда generate_thumbnails. Когда миниатюра готова, версии
+    областей поста сдвигаются, и кеш лент и страниц с заглушкой
+    сбрасывается.'''
+
+    def prepare(self, file_, geometry_string, options):
+        '''Источник и файл миниатюры так же, как их строит get_thumbnail'''
+        source = ImageFile(file_)
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return source, ImageFile(name, default.storage)
+
+    def get_ready(self, file_, geometry_string, **options):
+        source, thumbnail = self.prepare(file_, geometry_string, options)
+        cached = default.kvstore.get(thumbnail)
+        if cached is None and thumbnail.exists():
+            default.kvstore.get_or_set(source)
+            default.kvstore.set(thumbnail, source)
+            cached = thumbnail
+        return cached
+
+    def get_thumbnail(self, file_, geometry_string, **options):
+        return self.get_ready(file_, geometry_string, **options)
+
+    def create_files(self, name, force=False):
+        '''Режет все размеры миниатюр в хранилище без обращений к БД'''
+        source_image = None
+        try:
+            for geometry, options in THUMBNAIL_GEOMETRIES:
+                options = dict(options)
+                source, thumbnail = self.prepare(name, geometry, options)
+                if thumbnail.exists() and not force:
+                    continue
+                if source_image is None:
+                    source_image = default.engine.get_image(source)
+                options['image_info'] = default.engine.get_image_info(
+                    source_image)
+                self._create_thumbnail(
+                    source_image, geometry, options, thumbnail)
+                self._create_alternative_resolutions(
+                    source_image, geometry, options, thumbnail.name)
+        finally:
+            if source_image is not None:
+                default.engine.cleanup(source_image)
+
+
+def is_ready(name):
+    return all(
+        default.backend.get_ready(name, geometry, **options)
+        for geometry, options in THUMBNAIL_GEOMETRIES
+    )
+
+
+def create(name, scopes=(), force=False):
+    '''Режет миниатюры и сбрасывает кеш фрагментов лент,
+    где картинка показана заглушкой'''
+    default.backend.create_files(name, force=force)
+    if scopes:
+        stamps.bump(*scopes)
+
+
+def generate(name, scopes=(), force=False):
+    '''Задача пула потоков: create() с записью ошибки в лог'''
+    try:
+        create(name, scopes, force)
+    except Exception:
+        logger.exception('Не удалось создать миниатюры для %s', name)
+    finally:
+        with _lock:
+            _pending.discard(name)
+
+
+def get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails',
+            )
+    return _executor
+
+
+def schedule(name, scopes=()):
+    '''Ставит генерацию миниатюр в очередь задач core.jobs, а при
+    JOBS_ALWAYS_EAGER — в пул потоков этого процесса. Повторные вызовы
+    для картинки, которая уже ждёт своей очереди, игнорируются.'''
+    try:
+        if not name or not default.storage.exists(name):
+            return
+    except SuspiciousFileOperation:
+        return
+    if not settings.JOBS_ALWAYS_EAGER:
+        jobs.enqueue(
+            'posts.thumbnails', key=f'thumbnails:{name}',
+            name=name, scopes=list(scopes),
+        )
+        return
+    with _lock:
+        if name in _pending:
+            return
+        _pending.add(name)
+    future = get_executor().submit(generate, name, tuple(scopes))
+    if not hasattr(_local, 'futures'):
+        _local.futures = []
+    _local.futures.append(future)
+
+
+def wait_scheduled():
+    '''Дожидается задач, поставленных текущим потоком. Вызывается
+    по request_finished, когда ответ уже отдан клиенту: генерация
+    идёт параллельно с рендером, но не переживает запрос'''
+    futures = getattr(_local, 'futures', None)
+    if futures:
+        _local.futures = []
+        wait(futures)
@@ -0,0 +1,114 @@
+from django.db.models import Q
+
+from core import jobs
+from .constants import (
+    FANOUT_FOLLOWERS_LIMIT, TIMELINE_BACKFILL, TIMELINE_BATCH_SIZE
+)
+from .models import Follow, Post, TimelineEntry, User, UserStats
+from .stats import get_stats
+
+
+def _bulk_add(entries):
+    TimelineEntry.objects.bulk_create(
+        entries,
+        batch_size=TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def is_popular(author):
+    '''Автор с очень большим числом подписчиков: его посты
+    не раскладываются по лентам, а подтягиваются при чтении'''
+    return get_stats(author).followers_count >= FANOUT_FOLLOWERS_LIMIT
+
+
+def popular_authors(user):
+    '''Авторы из подписок пользователя, посты которых читаются напрямую'''
+    return Follow.objects.filter(
+        user=user,
+        author__stats__followers_count__gte=FANOUT_FOLLOWERS_LIMIT,
+    ).values('author')
+
+
+def fan_out(post):
+    '''Раскладывает новый пост по лентам подписчиков автора'''
+    if is_popular(post.author):
+        return
+    followers = Follow.objects.filter(
+        author=post.author
+    ).values_list('user_id', flat=True)
+    _bulk_add(
+        TimelineEntry(user_id=user_id, post=post) for user_id in followers
+    )
+
+
+def backfill(user, author):
+    '''Добавляет в ленту последние посты автора после подписки'''
+    if is_popular(author):
+        return
+    posts = Post.objects.filter(
+        author=author
+    ).values_list('pk', flat=True)[:TIMELINE_BACKFILL]
+    _bulk_add(TimelineEntry(user=user, post_id=pk) for pk in posts)
+
+
+def trim(user, author):
+    '''Убирает из ленты посты автора после отписки'''
+    TimelineEntry.objects.filter(user=user, post__author=author).delete()
+
+
+def rebuild(user):
+    '''Пересобирает ленту пользователя с нуля'''
+    TimelineEntry.objects.filter(user=user).delete()
+    for follow in Follow.objects.filter(user=user).select_related('author'):
+        backfill(user, follow.author)
+
+
+def followers_changed(author_id, delta):
+    '''Вызывается после сдвига счётчика подписчиков на delta. Если
+    автор пересёк порог популярности, ленты его подписчиков
+    перестраиваются задачей reconcile.'''
+    count = UserStats.objects.filter(user_id=author_id).values_list(
+        'followers_count', flat=True).first()
+    if count is None:
+        return
+    if (count >= FANOUT_FOLLOWERS_LIMIT) != (
+            count - delta >= FANOUT_FOLLOWERS_LIMIT):
+        jobs.enqueue(
+            'posts.reconcile_timelines', key=f'timeline:{author_id}',
+            author_id=author_id,
+        )
+
+
+def reconcile(author_id):
+    '''Приводит ленты подписчиков к текущей популярности автора:
+    посты ставшего популярным убирает из лент (они читаются напрямую),
+    а переставшего — раскладывает, включая написанные, пока он был
+    популярен. Подписчики обходятся пачками по id.'''
+    if is_popular(User(pk=author_id)):
+        TimelineEntry.objects.filter(post__author_id=author_id).delete()
+        return
+    posts = list(Post.objects.filter(
+        author_id=author_id
+    ).values_list('pk', flat=True)[:TIMELINE_BACKFILL])
+    followers = Follow.objects.filter(author_id=author_id).order_by('user_id')
+    last = 0
+    while True:
+        batch = list(followers.filter(user_id__gt=last).values_list(
+            'user_id', flat=True)[:TIMELINE_BATCH_SIZE])
+        if not batch:
+            break
+        _bulk_add(
+            TimelineEntry(user_id=user_id, post_id=pk)
+            for user_id in batch for pk in posts
+        )
+        last = batch[-1]
+
+
+def timeline_posts(user):
+    '''Посты ленты подписок: материализованная лента
+    плюс посты популярных авторов, прочитанные напрямую'''
+    inbox = TimelineEntry.objects.filter(user=user).values('post_id')
+    return Post.objects.filter(
+        Q(pk__in=inbox) | Q(author__in=popular_authors(user))
+    )
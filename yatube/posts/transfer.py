@@ -0,0 +1,291 @@
+import gzip
+import io
+import json
+import sqlite3
+from datetime import datetime
+from itertools import islice
+
+from django.db import transaction
+
+from . import archive
+from .models import (
+    ArchivedComment, ArchivedPost, Comment, Follow, Group, Post, User,
+)
+from .seeding import explicit_dates
+
+# Порядок выгрузки: строка ссылается только на модели выше неё.
+# (имя, модель, поля, внешние ключи: поле -> имя модели, естественный ключ)
+MODELS = (
+    ('user', User, (
+        'username', 'first_name', 'last_name', 'email', 'password',
+        'is_active', 'is_staff', 'is_superuser', 'date_joined', 'last_login',
+    ), {}, 'username'),
+    ('group', Group, ('title', 'slug', 'description'), {}, 'slug'),
+    ('post', Post, ('text', 'pub_date', 'image', 'author', 'group'), {
+        'author': 'user', 'group': 'group',
+    }, None),
+    ('comment', Comment, ('text', 'created', 'post', 'author'), {
+        'post': 'post', 'author': 'user',
+    }, None),
+    # Архив загружается обычными постами и комментариями: так строки
+    # получают новые id, не пересекающиеся с живыми постами, а после
+    # загрузки снова переезжают в архив (Importer.rearchive).
+    ('archivedpost', Post, ('text', 'pub_date', 'image', 'author', 'group'), {
+        'author': 'user', 'group': 'group',
+    }, None),
+    ('archivedcomment', Comment, ('text', 'created', 'post', 'author'), {
+        'post': 'archivedpost', 'author': 'user',
+    }, None),
+    ('follow', Follow, ('user', 'author'), {
+        'user': 'user', 'author': 'user',
+    }, None),
+)
+SPECS = {spec[0]: spec for spec in MODELS}
+# На эти модели ссылаются другие: их новые id запоминаются.
+REFERENCED = {'user', 'group', 'post', 'archivedpost'}
+# Откуда выгружаются модели, которые загружаются в другую таблицу.
+SOURCES = {'archivedpost': ArchivedPost, 'archivedcomment': ArchivedComment}
+
+
+def open_stream(path, mode):
+    '''Текстовый поток NDJSON; сжатие по расширению: .gz или .zst
+    (для .zst нужен пакет zstandard)'''
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    if path.endswith('.zst'):
+        try:
+            import zstandard
+        except ImportError:
+            raise ValueError('Для .zst нужен пакет zstandard')
+        raw = open(path, mode + 'b')
+        if mode == 'w':
+            stream = zstandard.ZstdCompressor().stream_writer(raw)
+        else:
+            stream = zstandard.ZstdDecompressor().stream_reader(raw)
+        return io.TextIOWrapper(stream, encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def encode(value):
+    '''Даты — полным isoformat: DjangoJSONEncoder обрезает их
+    до миллисекунд, и порядок постов после загрузки мог бы сбиться'''
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} не сериализуется в JSON')
+
+
+def export(stream, chunk_size=2000, report=None):
+    '''Пишет все модели построчно; строки читаются из БД курсором
+    порциями по chunk_size, так что память не зависит от объёма.
+    Возвращает число строк каждой модели.'''
+    counts = {}
+    for name, model, fields, _, _ in MODELS:
+        model = SOURCES.get(name, model)
+        rows = model.objects.order_by('pk').values('pk', *fields).iterator(
+            chunk_size=chunk_size)
+        done = 0
+        for row in rows:
+            pk = row.pop('pk')
+            stream.write(json.dumps(
+                {'model': name, 'id': pk, 'fields': row},
+                default=encode, ensure_ascii=False,
+            ) + '\n')
+            done += 1
+            if report and done % chunk_size == 0:
+                report(name, done)
+        counts[name] = done
+        if report:
+            report(name, done)
+    return counts
+
+
+class Importer:
+    '''Загружает выгрузку export() пачками bulk_create.
+
+    Соответствие старых id новым и номер последней загруженной строки
+    хранятся в отдельном файле SQLite state_path, а не в памяти:
+    память постоянна при любом объёме, а прерванная загрузка
+    продолжается с места остановки. Пользователи и группы, уже
+    существующие в базе (по username и slug), не дублируются.
+
+    База и файл состояния коммитятся раздельно, поэтому перед вставкой
+    пачки в состоянии отмечается незавершённая пачка и прежний
+    максимум id её модели. Если загрузка оборвалась после коммита
+    пачки в базе, но до записи состояния, при продолжении пачка
+    не вставляется заново: новые id берутся из строк после максимума.'''
+
+    def __init__(self, state_path, batch_size=1000, report=None):
+        self.batch_size = batch_size
+        self.report = report or (lambda name, done: None)
+        self.state = sqlite3.connect(state_path)
+        self.state.executescript('''
+            CREATE TABLE IF NOT EXISTS idmap (
+                model TEXT, old INTEGER, new INTEGER,
+                PRIMARY KEY (model, old)
+            );
+            CREATE TABLE IF NOT EXISTS progress (
+                id INTEGER PRIMARY KEY CHECK (id = 1), line INTEGER,
+                pending_line INTEGER, pending_model TEXT, pending_last INTEGER
+            );
+            INSERT OR IGNORE INTO progress (id, line) VALUES (1, 0);
+        ''')
+        self.state.commit()
+        self.counts = {}
+
+    def close(self):
+        self.state.close()
+
+    @property
+    def done_lines(self):
+        return self.state.execute('SELECT line FROM progress').fetchone()[0]
+
+    @property
+    def pending(self):
+        '''(строка, модель, прежний максимум id) незавершённой пачки'''
+        row = self.state.execute(
+            'SELECT pending_line, pending_model, pending_last FROM progress'
+        ).fetchone()
+        return row if row[0] is not None else None
+
+    def lookup(self, name, old_ids):
+        ids = list(old_ids)
+        if not ids:
+            return {}
+        placeholders = ','.join('?' * len(ids))
+        return dict(self.state.execute(
+            f'SELECT old, new FROM idmap WHERE model = ? '
+            f'AND old IN ({placeholders})', [name, *ids],
+        ))
+
+    def remap(self, name, records):
+        '''Подставляет новые id внешних ключей; строки, чья цель
+        не загружена, пропускаются'''
+        links = SPECS[name][3]
+        maps = {
+            field: self.lookup(target, {
+                record['fields'][field] for record in records
+                if record['fields'][field] is not None
+            })
+            for field, target in links.items()
+        }
+        result = []
+        for record in records:
+            fields = dict(record['fields'])
+            for field, mapping in maps.items():
+                old = fields.pop(field)
+                if old is not None and old not in mapping:
+                    break
+                fields[f'{field}_id'] = mapping.get(old)
+            else:
+                result.append((record['id'], fields))
+        return result
+
+    def insert(self, name, rows, last, create=True):
+        '''Вставляет строки и возвращает пары (старый id, новый id).
+        В одной транзакции новые id идут подряд после прежнего
+        максимума last — как и в posts.seeding. create=False только
+        сопоставляет id пачки, уже вставленной до обрыва.'''
+        model, natural = SPECS[name][1], SPECS[name][4]
+        pairs, fresh = [], rows
+        if natural:
+            existing = dict(model.objects.filter(**{
+                f'{natural}__in': [fields[natural] for _, fields in rows],
+            }).values_list(natural, 'pk'))
+            pairs = [
+                (old, existing[fields[natural]]) for old, fields in rows
+                if fields[natural] in existing
+            ]
+            fresh = [
+                (old, fields) for old, fields in rows
+                if fields[natural] not in existing
+            ]
+        if create:
+            model.objects.bulk_create(
+                [model(**fields) for _, fields in fresh],
+                ignore_conflicts=name == 'follow',
+            )
+        if name in REFERENCED:
+            new_ids = model.objects.filter(pk__gt=last).order_by(
+                'pk').values_list('pk', flat=True)
+            pairs += zip((old for old, _ in fresh), new_ids)
+        return pairs
+
+    def last_pk(self, name):
+        return SPECS[name][1].objects.order_by('-pk').values_list(
+            'pk', flat=True).first() or 0
+
+    def save(self, name, pairs, line, loaded):
+        '''Записывает новые id и номер строки, снимая отметку
+        о незавершённой пачке'''
+        self.state.executemany(
+            'INSERT OR REPLACE INTO idmap VALUES (?, ?, ?)',
+            [(name, old, new) for old, new in pairs],
+        )
+        self.state.execute(
+            'UPDATE progress SET line = ?, pending_line = NULL, '
+            'pending_model = NULL, pending_last = NULL', [line])
+        self.state.commit()
+        self.counts[name] = self.counts.get(name, 0) + loaded
+        self.report(name, self.counts[name])
+
+    def flush(self, name, records, line):
+        rows = self.remap(name, records)
+        last = self.last_pk(name)
+        self.state.execute(
+            'UPDATE progress SET pending_line = ?, pending_model = ?, '
+            'pending_last = ?', [line, name, last])
+        self.state.commit()
+        with transaction.atomic():
+            pairs = self.insert(name, rows, last)
+        self.save(name, pairs, line, len(rows))
+
+    def recover(self, stream):
+        '''Завершает пачку, прерванную между коммитом в базе и записью
+        состояния: если её строки уже в базе, только сопоставляет id,
+        иначе загружает пачку заново'''
+        line, name, last = self.pending
+        done = self.done_lines
+        records = [json.loads(text) for text in islice(stream, line - done)]
+        if not SPECS[name][1].objects.filter(pk__gt=last).exists():
+            self.flush(name, records, line)
+            return
+        rows = self.remap(name, records)
+        self.save(
+            name, self.insert(name, rows, last, create=False), line, len(rows))
+
+    def load(self, stream):
+        '''Загружает строки потока после уже загруженных ранее'''
+        done = self.done_lines
+        stream = islice(stream, done, None)
+        with explicit_dates():
+            if self.pending:
+                self.recover(stream)
+                done = self.done_lines
+            records, name, line = [], None, done
+            for line, text in enumerate(stream, done + 1):
+                record = json.loads(text)
+                if record['model'] != name or len(records) >= self.batch_size:
+                    if records:
+                        self.flush(name, records, line - 1)
+                    records, name = [], record['model']
+                records.append(record)
+            if records:
+                self.flush(name, records, line)
+        self.rearchive()
+        return self.counts
+
+    def rearchive(self):
+        '''Переносит загруженные архивные посты обратно в архив.
+        Уже перенесённые пропускаются, так что повторный запуск
+        после обрыва безопасен.'''
+        last = 0
+        while True:
+            ids = [new for new, in self.state.execute(
+                "SELECT new FROM idmap WHERE model = 'archivedpost' "
+                'AND new > ? ORDER BY new LIMIT ?', [last, self.batch_size],
+            )]
+            if not ids:
+                return
+            archive.archive_batch(list(
+                Post.objects.filter(pk__in=ids).values_list('pk', flat=True)))
+            last = ids[-1]
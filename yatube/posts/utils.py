@@ -1,9 +1,242 @@
-from django.core.paginator import Paginator
-from .constants import PER_PAGE
+import base64
+import binascii
+import hashlib
+import heapq
+from math import ceil
 
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.http import Http404
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
 
-def paginate_page(request, posts):
-    paginator = Paginator(posts, PER_PAGE)
+from .constants import (
+    COMMENTS_PER_PAGE, FEED_CACHE_TIMEOUT, GROUP_CACHE_TIMEOUT, PAGE_WINDOW,
+    PER_PAGE
+)
+from .counts import CountProvider, KnownCount
+from .models import Group, Post, User
+
+
+def encode_cursor(value, pk):
+    raw = f'{value.isoformat()}|{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    '''Возвращает пару (дата, id) или None для пустого/битого токена'''
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        value, pk = raw.decode().rsplit('|', 1)
+        value = parse_datetime(value)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if value is None:
+        return None
+    return value, pk
+
+
+class CursorPaginator(Paginator):
+    '''Пагинация по ключу (дата, id): без COUNT и OFFSET.
+    Номерные страницы (?page=) работают как у обычного Paginator.
+
+    fallback — вторая выборка с теми же полями (например, архив):
+    её строки вливаются в ленту в общем порядке по ключу.'''
+
+    def __init__(self, object_list, per_page, field='pub_date',
+                 counter=None, descending=True, fallback=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.field = field
+        self.counter = counter
+        self.descending = descending
+        self.fallback = fallback
+
+    @cached_property
+    def count(self):
+        if self.counter is None:
+            return super().count
+        return self.counter.count(self.object_list)
+
+    @cached_property
+    def total_pages(self):
+        '''Число страниц по (возможно, приблизительному) счётчику'''
+        return max(1, ceil((self.count - self.orphans) / self.per_page))
+
+    def page_window(self, number, on_each_side=PAGE_WINDOW):
+        '''Номера страниц вокруг текущей вместо полного page_range'''
+        return range(
+            max(1, number - on_each_side),
+            min(self.total_pages, number + on_each_side) + 1,
+        )
+
+    def _cursor(self, obj):
+        return encode_cursor(getattr(obj, self.field), obj.pk)
+
+    def ordered(self, after=None, before=None, object_list=None):
+        '''Выборка в порядке ленты, начиная после (или до) курсора'''
+        if object_list is None:
+            object_list = self.object_list
+        field = self.field
+        sign, back = ('-', '') if self.descending else ('', '-')
+        ahead, behind = ('lt', 'gt') if self.descending else ('gt', 'lt')
+        if before is not None:
+            value, pk = before
+            queryset = object_list.filter(
+                Q(**{f'{field}__{behind}': value})
+                | Q(**{field: value, f'pk__{behind}': pk})
+            ).order_by(f'{back}{field}', f'{back}pk')
+        else:
+            queryset = object_list.order_by(f'{sign}{field}', f'{sign}pk')
+            if after is not None:
+                value, pk = after
+                queryset = queryset.filter(
+                    Q(**{f'{field}__{ahead}': value})
+                    | Q(**{field: value, f'pk__{ahead}': pk})
+                )
+        return queryset
+
+    def _merged(self, limit, after=None, before=None):
+        '''Первые limit строк основной выборки и fallback вместе'''
+        rows = self.ordered(after, before)[:limit]
+        if self.fallback is None:
+            return list(rows)
+        extra = self.ordered(after, before, self.fallback)[:limit]
+        reverse = self.descending == (before is None)
+        return list(heapq.merge(
+            rows, extra, reverse=reverse,
+            key=lambda obj: (getattr(obj, self.field), obj.pk),
+        ))[:limit]
+
+    def page(self, number):
+        if self.fallback is None:
+            return super().page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        top = bottom + self.per_page
+        rows = self._merged(top)[bottom:top]
+        return self._get_page(rows, number, self)
+
+    def _rows(self, after=None, before=None):
+        rows = self._merged(self.per_page + 1, after, before)
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if before is not None:
+            rows.reverse()
+        return rows, more
+
+    def cursor_page(self, after=None, before=None):
+        '''Страница после/до курсора; без курсора — первая страница'''
+        if before is not None:
+            after = None
+        rows, more = self._rows(after, before)
+        if not rows and (after or before):
+            return self.cursor_page()
+        has_previous = after is not None or (before is not None and more)
+        has_next = before is not None or more
+        number = 2 if has_previous else 1
+        # Число страниц заранее неизвестно: Page.has_next() опирается
+        # на num_pages, поэтому считаем, что есть ещё ровно одна.
+        self.num_pages = number + 1 if has_next else number
+        page = Page(rows, number, self)
+        page.previous_cursor = self._cursor(rows[0]) if has_previous else None
+        page.next_cursor = self._cursor(rows[-1]) if has_next else None
+        return page
+
+
+def paginate_page(request, posts, count_scope=None, count=None,
+                  fallback=None):
+    '''Страница ленты: по курсору или, для ?page=N, по номеру.
+
+    Номера страниц показываются окном, размер выборки берётся
+    из CountProvider (count_scope — именованная область счётчика)
+    или передаётся готовым в count. fallback — выборка архива,
+    которая продолжает ленту.'''
+    counter = CountProvider(count_scope) if count is None else KnownCount(
+        count)
+    paginator = CursorPaginator(
+        posts, PER_PAGE, counter=counter, fallback=fallback)
     page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    return page_obj
+    if page_number is not None:
+        page = paginator.get_page(page_number)
+        page.previous_cursor = page.next_cursor = None
+    else:
+        page = paginator.cursor_page(
+            after=decode_cursor(request.GET.get('after')),
+            before=decode_cursor(request.GET.get('before')),
+        )
+    page.page_window = ()
+    if page_number is not None or not page.has_previous():
+        page.page_window = paginator.page_window(page.number)
+    return page
+
+
+def paginate_numbered(request, object_list):
+    '''Нумерованная страница с окном номеров: для выборок без ключа
+    курсора, например результатов поиска'''
+    paginator = CursorPaginator(object_list, PER_PAGE)
+    page = paginator.get_page(request.GET.get('page'))
+    page.previous_cursor = page.next_cursor = None
+    page.page_window = paginator.page_window(page.number)
+    return page
+
+
+def paginate_comments(request, comments):
+    '''Комментарии от старых к новым порциями по курсору ?after='''
+    paginator = CursorPaginator(
+        comments, COMMENTS_PER_PAGE, field='created', descending=False)
+    return paginator.cursor_page(
+        after=decode_cursor(request.GET.get('after')))
+
+
+def group_cache_key(slug):
+    return 'posts:group:' + hashlib.md5(slug.encode()).hexdigest()
+
+
+def get_group_or_404(slug):
+    '''Группа по slug из кеша; кеш сбрасывается сигналами Group'''
+    key = group_cache_key(slug)
+    group = cache.get(key)
+    if group is None:
+        group = Group.objects.filter(slug=slug).first()
+        if group is None:
+            raise Http404('Группа не найдена')
+        cache.set(key, group, GROUP_CACHE_TIMEOUT)
+    return group
+
+
+def user_id_key(username):
+    return 'posts:user-id:' + hashlib.md5(username.encode()).hexdigest()
+
+
+def user_id(username):
+    '''id пользователя по username из кеша; кеш сбрасывается
+    сигналами User'''
+    key = user_id_key(username)
+    pk = cache.get(key)
+    if pk is None:
+        pk = User.objects.filter(
+            username=username).values_list('pk', flat=True).first()
+        if pk is not None:
+            cache.set(key, pk, FEED_CACHE_TIMEOUT)
+    return pk
+
+
+def post_author_key(post_id):
+    return f'posts:post-author:{post_id}'
+
+
+def post_author_id(post_id):
+    '''id автора поста из кеша: автор поста не меняется'''
+    key = post_author_key(post_id)
+    author_id = cache.get(key)
+    if author_id is None:
+        author_id = Post.objects.filter(
+            pk=post_id
+        ).values_list('author_id', flat=True).first()
+        if author_id is not None:
+            cache.set(key, author_id, FEED_CACHE_TIMEOUT)
+    return author_id
@@ -1,65 +1,193 @@
+from urllib.parse import urlencode
+
+from django.http import JsonResponse
 from django.shortcuts import render, get_object_or_404, redirect
-from .models import Post, Group, User, Follow
-from .constants import PER_PAGE
+from .models import ArchivedPost, Post, User
 from .forms import PostForm, CommentForm
 from django.contrib.auth.decorators import login_required
-from .utils import paginate_page
+from .utils import (
+    get_group_or_404, paginate_comments, paginate_numbered, paginate_page,
+    post_author_id, user_id
+)
+from .timeline import timeline_posts
+from .feeds import comment_queryset, feed_queryset, query_budget
+from .stamps import conditional, fragment_key, per_request
+from .pages import cached_page
+from .constants import FEED_CACHE_TIMEOUT
+from .stats import get_stats
+from .follows import follow, is_following, unfollow
+from .search import SearchResults
+from core.concurrent import fetch
+
+
+def viewer_scopes(request):
+    if request.user.is_authenticated:
+        return [f'follows:{request.user.pk}']
+    return []
+
+
+def index_scopes(request):
+    return ['all']
+
+
+def group_scopes(request, slug):
+    return [f'group:{get_group_or_404(slug).pk}']
+
+
+def profile_author_id(request, username):
+    return user_id(username)
+
+
+def profile_page_scopes(request, username):
+    author_id = per_request(profile_author_id, request, username)
+    if author_id is None:
+        return None
+    return [f'author:{author_id}', f'follows:{author_id}']
+
+
+def profile_scopes(request, username):
+    scopes = per_request(profile_page_scopes, request, username)
+    if scopes is None:
+        return None
+    return scopes + viewer_scopes(request)
+
+
+def profile_holes(request, username):
+    author = User(
+        pk=per_request(profile_author_id, request, username),
+        username=username,
+    )
+    return {
+        'author': author,
+        'following': is_following(request.user, [author])[author.pk],
+    }
+
 
+def post_scopes(request, post_id):
+    author_id = post_author_id(post_id)
+    if author_id is None:
+        return None
+    return [f'post:{post_id}', f'author:{author_id}']
 
+
+def post_holes(request, post_id):
+    return {
+        'post': Post(pk=post_id, author_id=post_author_id(post_id)),
+        'form': CommentForm(),
+    }
+
+
+@conditional(index_scopes)
+@cached_page(index_scopes)
+@query_budget
 def index(request):
     template = 'posts/index.html'
-    post_list = Post.objects.all()
-    page_obj = paginate_page(request, post_list)
+    post_list = feed_queryset('index')
+    page_obj = paginate_page(request, post_list, 'all')
     context = {
         'page_obj': page_obj,
+        'feed_key': fragment_key(request, 'index', 'all'),
+        'feed_timeout': FEED_CACHE_TIMEOUT,
     }
     return render(request, template, context)
 
 
+@conditional(group_scopes)
+@cached_page(group_scopes)
+@query_budget
 def group_posts(request, slug):
     template = 'posts/group_list.html'
-    post_list = Post.objects.all()
-    page_obj = paginate_page(request, post_list)
-    group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()[:PER_PAGE]
+    group = get_group_or_404(slug)
+    post_list = feed_queryset('group', group.posts.all())
+    page_obj = paginate_page(request, post_list, f'group:{group.pk}')
     context = {
         'group': group,
-        'posts': posts,
-        'page_obj': page_obj
+        'page_obj': page_obj,
+        'feed_key': fragment_key(request, 'group', f'group:{group.pk}'),
+        'feed_timeout': FEED_CACHE_TIMEOUT,
     }
     return render(request, template, context)
 
 
+@conditional(profile_scopes)
+@cached_page(profile_page_scopes, profile_holes)
+@query_budget
 def profile(request, username):
     template = 'posts/profile.html'
-    posts = Post.objects.filter(author__username=username).all()
     author = get_object_or_404(User, username=username)
-    page_obj = paginate_page(request, posts)
-    following = False
-    if request.user.is_authenticated:
-        following = Follow.objects.filter(user=request.user).filter(
-            author=author
-        ).exists()
+    parts = fetch(
+        author_stats=lambda: get_stats(author),
+        following=lambda: is_following(request.user, [author])[author.pk],
+    )
+    author_stats, following = parts['author_stats'], parts['following']
+    posts = feed_queryset('profile', author.posts.all())
+    page_obj = paginate_page(
+        request, posts, count=author_stats.posts_count,
+        fallback=feed_queryset('profile', author.archived_posts.all()))
     context = {
         'author': author,
-        'posts': posts,
+        'author_stats': author_stats,
         'page_obj': page_obj,
-        'following': following
+        'following': following,
+        'feed_key': fragment_key(request, 'profile', f'author:{author.pk}'),
+        'feed_timeout': FEED_CACHE_TIMEOUT,
     }
     return render(request, template, context)
 
 
+@conditional(post_scopes)
+@cached_page(post_scopes, post_holes)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    post_count = Post.objects.filter(author=post.author).count()
+    post = Post.objects.select_related('author').filter(pk=post_id).first()
+    if post is None:
+        post = get_object_or_404(
+            ArchivedPost.objects.select_related('author'), pk=post_id)
+    parts = fetch(
+        author_stats=lambda: get_stats(post.author),
+        comments=lambda: paginate_comments(request, comment_queryset(post)),
+    )
+    author_stats = parts['author_stats']
     template = 'posts/post_detail.html'
     form = CommentForm()
     context = {
         'post': post,
-        'post_count': post_count,
+        'post_count': author_stats.posts_count,
+        'author_stats': author_stats,
         'form': form,
         'username': request.user,
-        'comments': post.comments.all(),
+        'comments': parts['comments'],
+    }
+    return render(request, template, context)
+
+
+def post_comments(request, post_id):
+    post = (
+        Post.objects.only('pk').filter(pk=post_id).first()
+        or get_object_or_404(ArchivedPost.objects.only('pk'), pk=post_id)
+    )
+    comments = paginate_comments(request, comment_queryset(post))
+    return JsonResponse({
+        'comments': [
+            {
+                'id': comment.pk,
+                'author': comment.author.username,
+                'text': comment.text,
+                'created': comment.created.isoformat(),
+            }
+            for comment in comments
+        ],
+        'next': comments.next_cursor,
+    })
+
+
+def search(request):
+    template = 'posts/search.html'
+    query = request.GET.get('q', '').strip()
+    page_obj = paginate_numbered(request, SearchResults(query))
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+        'page_query': urlencode({'q': query}),
     }
     return render(request, template, context)
 
@@ -115,9 +243,10 @@ def add_comment(request, post_id):
 
 
 @login_required
+@query_budget
 def follow_index(request):
     template = 'posts/follow.html'
-    posts = Post.objects.filter(author__following__user=request.user)
+    posts = feed_queryset('follow', timeline_posts(request.user))
     page_obj = paginate_page(request, posts)
     context = {
         'posts': posts,
@@ -129,18 +258,12 @@ def follow_index(request):
 @login_required
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
-    user = request.user
-    follow = Follow.objects.filter(user=user, author=author)
-    if user != author and not follow.exists():
-        Follow.objects.create(user=user, author=author)
+    follow(request.user, author)
     return redirect('posts:profile', username=username)
 
 
 @login_required
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
-    user = request.user
-    follow = Follow.objects.get(user=user, author=author)
-    if user != author and follow:
-        follow.delete()
+    unfollow(request.user, author)
     return redirect('posts:profile', username=username)
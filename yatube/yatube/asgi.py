@@ -0,0 +1,17 @@
+"""
+ASGI config for yatube project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Django 2.2 has no native ASGI support, so the WSGI handler is served
+through core.asgi.WsgiToAsgi, e.g. ``uvicorn yatube.asgi:application``.
+"""
+
+import os
+
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+from core.asgi import WsgiToAsgi  # noqa: E402
+
+application = WsgiToAsgi(get_wsgi_application())
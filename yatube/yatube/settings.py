@@ -29,6 +29,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.ProfileMiddleware',
+    'core.middleware.ReplicaStickinessMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -43,7 +45,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.backends.ProfilingDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -53,6 +55,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.year.year',
+                'core.context_processors.profile.profile',
             ],
         },
     },
@@ -65,9 +68,39 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': 60,
     }
 }
 
+# Реплика только для чтения — копия основной базы, которую обновляет
+# внешняя репликация (например, Litestream). Без YATUBE_REPLICA_DB
+# все запросы идут в default. Чтения распределяет core.routers.ReplicaRouter,
+# после записи пользователь REPLICA_STICKY_SECONDS читает из default.
+REPLICA_DB = os.environ.get('YATUBE_REPLICA_DB')
+if REPLICA_DB:
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': REPLICA_DB,
+        'CONN_MAX_AGE': 60,
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_REPLICAS = ['replica'] if REPLICA_DB else []
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+REPLICA_STICKY_COOKIE = 'read_primary'
+REPLICA_STICKY_SECONDS = 10
+
+# Применяются к каждому соединению с SQLite (core.signals.tune_sqlite).
+# WAL: читатели не блокируются писателями; NORMAL в WAL надёжен
+# и не делает fsync на каждый коммит; mmap_size и cache_size в байтах
+# и в КиБ (отрицательное значение); busy_timeout в миллисекундах.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'busy_timeout': 5000,
+}
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -84,9 +117,25 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Двухуровневый кеш (core.cache.TieredCache): LRU в памяти процесса
+# перед общим L2. С YATUBE_CACHE_DIR L2 — файловый кеш, общий для всех
+# воркеров; без него — LocMemCache, достаточный для одного процесса.
+CACHE_DIR = os.environ.get('YATUBE_CACHE_DIR')
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache.TieredCache',
+        'LOCATION': CACHE_DIR or 'yatube',
+        'OPTIONS': {
+            'L2_BACKEND': (
+                'django.core.cache.backends.filebased.FileBasedCache'
+                if CACHE_DIR else
+                'django.core.cache.backends.locmem.LocMemCache'
+            ),
+            'L2_OPTIONS': {'MAX_ENTRIES': 100000},
+            'L1_MAX_ENTRIES': 10000,
+            'L1_MAX_AGE': 60,
+            'SYNC_INTERVAL': 0.1,
+        },
     }
 }
 
@@ -117,3 +166,53 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Миниатюры режутся вне запроса пулом из THUMBNAIL_WORKERS потоков.
+THUMBNAIL_BACKEND = 'posts.thumbnails.DeferredThumbnailBackend'
+THUMBNAIL_WORKERS = 2
+
+# yatube/asgi.py: WSGI-обработчик выполняется в пуле из ASGI_THREADS
+# потоков. VIEW_CONCURRENCY включает одновременную загрузку независимых
+# частей страниц (core.concurrent.fetch) в пуле VIEW_CONCURRENCY_WORKERS;
+# выключено по умолчанию: каждой части нужно своё соединение с БД.
+ASGI_THREADS = 16
+VIEW_CONCURRENCY = False
+VIEW_CONCURRENCY_WORKERS = 8
+
+# Очередь фоновых задач core.jobs: задачи выполняют воркеры
+# manage.py run_workers, а вью отвечают сразу после записи в БД.
+# С YATUBE_JOBS_EAGER=1 задачи выполняются в процессе, который их
+# поставил (разработка без воркеров); тесты включают это сами
+# (core.runner.EagerJobsRunner, conftest.py).
+JOBS_ALWAYS_EAGER = os.environ.get('YATUBE_JOBS_EAGER') == '1'
+JOBS_MAX_ATTEMPTS = 5
+JOBS_BACKOFF_BASE = 2
+JOBS_BACKOFF_MAX = 600
+JOBS_LOCK_TIMEOUT = 300
+JOBS_BATCH_SIZE = 10
+JOBS_POLL_INTERVAL = 1
+TEST_RUNNER = 'core.runner.EagerJobsRunner'
+
+# Бюджет запросов к БД для вью лент (posts.feeds.query_budget);
+# None — проверка выключена, тесты включают её через override_settings.
+FEED_QUERY_BUDGET = None
+
+# Доля запросов, которые профилирует core.middleware.ProfileMiddleware
+# (Server-Timing и строка в лог core.profile); при DEBUG — все запросы.
+PROFILE_SAMPLE_RATE = 0
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core.profile': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+    },
+}